@@ -1,367 +1,627 @@
 import os
-import httpx
-from datetime import datetime, timedelta
-from typing import Optional, List
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional, List
 from contextlib import asynccontextmanager
-import numpy as np
+from dataclasses import asdict
 
-from fastapi import FastAPI, Depends, Query, HTTPException
+from fastapi import FastAPI, Depends, Path, Query, HTTPException, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, RedirectResponse
-from sqlalchemy import func, desc
+from fastapi.responses import FileResponse, RedirectResponse, Response, StreamingResponse
+from sqlalchemy import desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from apscheduler.schedulers.background import BackgroundScheduler
 
-from fastapi.responses import JSONResponse
-
-from database import engine, Base, get_db, SessionLocal
-from models import SensorReading, DeviceState, AIOutput, CoinMetric, HourlyAggregate, LikeEvent
+from database import engine, async_engine, Base, get_async_db, upgrade_schema
+from models import SensorReading, DeviceTransition, AIOutput, CoinMetric, HourlyAggregate, WebcamFrame
 
 import object_storage
+from ingest import IngestionPipeline, Source, content_hash
+from write_buffer import ARCHIVED, OBSERVED, WriteBuffer, observed_rows, strip_role
+from current_state import CurrentState, SensorSnapshot
+from likes import LikeCounter, RateLimiter
+from stats import TableStats
+from response_cache import CacheMiddleware, ResponseCache
+from coordinator import Coordinator
+from compression import MODE_RECONSTRUCTION, RECONSTRUCT_PATTERN, SensorCompressor, append_point, error_header, load_points, reconstruct
+from devices import DEVICE_NAMES, DeviceLog, device_history_table, import_device_states, uptime_summary
+from webcam import FRAME_SIZE_PATTERN, FrameProcessor, frame_page, frame_variant_path, import_bucket_frames
+from timelapse import OVERVIEW, TimelapseBuilder, day_key, list_timelapses, sol_date, timelapse_index
+from signing import UrlSigner
+from dashboard import Dashboard
+from events import Broadcaster, TooManyClients
+from downsample import downsample_table, downsample_state_table
+from exports import EXPORT_FORMATS, EXPORT_PATTERN, export_stream, likes_document
+from formats import FORMAT_PATTERN, Table, negotiate, render_table
+from pagination import Page, keyset_page
+from rollups import (
+    HourlyRollup, RollupPyramid, RESOLUTION_CHOICES, SENSOR_PYRAMID, COIN_PYRAMID,
+    read_device_rollup, read_rollup, select_resolution
+)
 
 EXTERNAL_API_BASE = "https://autoncorp.com/biodome/"
 WEBCAM_URL = f"{EXTERNAL_API_BASE}get_webcam.php"
 PUMPFUN_API = "https://frontend-api-v3.pump.fun/coins/jk1T35eWK41MBMM8AWoYVaNbjHEEQzMDetTsfnqpump"
 
-latest_webcam_frame_path: Optional[str] = None
-
-scheduler = BackgroundScheduler()
+PLANT_SOURCE = Source("plant", f"{EXTERNAL_API_BASE}get_status.php", timeout=15)
+COIN_SOURCE = Source("coin", PUMPFUN_API, timeout=15, headers={"Accept": "application/json"})
+WEBCAM_SOURCE = Source("webcam", WEBCAM_URL, timeout=30)
+
+PLANT_POLL_SECONDS = float(os.environ.get("PLANT_POLL_SECONDS", "120"))
+COIN_POLL_SECONDS = float(os.environ.get("COIN_POLL_SECONDS", "300"))
+WEBCAM_POLL_SECONDS = float(os.environ.get("WEBCAM_POLL_SECONDS", "120"))
+LIKE_RECONCILE_SECONDS = float(os.environ.get("LIKE_RECONCILE_SECONDS", "600"))
+STATS_RECONCILE_SECONDS = float(os.environ.get("STATS_RECONCILE_SECONDS", "3600"))
+# Proxies in front of the app that append to X-Forwarded-For; 0 ignores the header.
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "1"))
+
+pipeline = IngestionPipeline()
+write_buffer = WriteBuffer()
+hourly_rollup = HourlyRollup()
+write_buffer.add_listener(hourly_rollup.on_flush)
+rollup_pyramid = RollupPyramid()
+write_buffer.add_hook(rollup_pyramid.on_flush)
+current_state = CurrentState()
+write_buffer.add_listener(current_state.on_flush)
+device_log = DeviceLog(write_buffer)
+write_buffer.add_hook(device_log.on_flush)
+like_counter = LikeCounter(write_buffer)
+write_buffer.add_hook(like_counter.on_flush)
+write_buffer.add_listener(like_counter.after_flush)
+like_limiter = RateLimiter()
+sensor_compressor = SensorCompressor(SENSOR_PYRAMID.stat_fields)
+frame_processor = FrameProcessor()
+leader_task: Optional[asyncio.Task] = None
+timelapse_builder = TimelapseBuilder()
+table_stats = TableStats()
+write_buffer.add_hook(table_stats.on_flush)
+write_buffer.add_listener(table_stats.after_flush)
+broadcaster = Broadcaster()
+url_signer = UrlSigner()
+
+def publish_new_rows(batch: Dict[type, List[dict]]):
+    version = current_state.version
+    for values in observed_rows(batch.get(SensorReading, [])):
+        values = strip_role(values)
+        broadcaster.publish("sensors", {**values, "timestamp": values["timestamp"].isoformat(), "version": version})
+    changes: Dict[datetime, Dict[str, bool]] = {}
+    for values in batch.get(DeviceTransition, []):
+        changes.setdefault(values["timestamp"], {})[values["device"]] = values["state"]
+    for timestamp, states in sorted(changes.items()):
+        broadcaster.publish("devices", {"timestamp": timestamp.isoformat(), "version": version, **states})
+    for values in batch.get(CoinMetric, []):
+        broadcaster.publish("coin", {
+            "timestamp": values["timestamp"].isoformat(),
+            "version": version,
+            "price": values.get("price"),
+            "market_cap": values.get("market_cap"),
+            "usd_market_cap": values.get("usd_market_cap"),
+            "holders": values.get("holders")
+        })
+    for values in batch.get(AIOutput, []):
+        broadcaster.publish("ai", {
+            "timestamp": values["timestamp"].isoformat(),
+            "version": version,
+            "output_text": values.get("output_text"),
+            "sol_day": values.get("sol_day")
+        })
+    for values in batch.get(WebcamFrame, []):
+        broadcaster.publish("webcam", {"path": values["path"], "timestamp": values["timestamp"].isoformat()})
+
+write_buffer.add_listener(publish_new_rows)
+
+def cache_max_age() -> Optional[float]:
+    seconds = pipeline.seconds_until_next_run('plant_data', 'coin_data')
+    pending = write_buffer.seconds_until_flush()
+    if seconds is None or pending is None:
+        return seconds
+    # Rows from the last poll only become visible when the buffer flushes;
+    # expire responses built before that then, not at the next poll.
+    return min(seconds, pending)
+
+CACHED_PATHS = [
+    "/api/sensors/latest", "/api/sensors/history", "/api/devices/latest", "/api/devices/history", "/api/devices/uptime",
+    "/api/coin/latest", "/api/coin/history", "/api/ai/latest", "/api/aggregates/hourly",
+    "/api/analytics/trends", "/api/analytics/predictions", "/api/stats", "/api/dashboard",
+]
+# Registered last so every other listener has updated its state before the
+# cached bodies are invalidated.
+response_cache = ResponseCache(
+    max_age=cache_max_age,
+    paths=CACHED_PATHS,
+    models=[SensorReading, DeviceTransition, CoinMetric, AIOutput, HourlyAggregate]
+)
+write_buffer.add_listener(response_cache.on_flush)
+
+# Rows flushed by other workers arrive over LISTEN/NOTIFY and feed the same
+# in-memory state; database-writing listeners (hourly_rollup) stay local.
+coordinator = Coordinator()
+write_buffer.add_hook(coordinator.on_flush)
+coordinator.add_listener(current_state.on_flush)
+coordinator.add_listener(table_stats.after_flush)
+coordinator.add_listener(like_counter.apply_remote)
+coordinator.add_listener(publish_new_rows)
+coordinator.add_listener(response_cache.on_flush)
+
+def refresh_from_database(tables: List[str]):
+    current_state.warm()
+    response_cache.bump()
+
+coordinator.add_refresh_listener(refresh_from_database)
+
+AGGREGATE_BACKFILL_HOURS = int(os.environ.get("AGGREGATE_BACKFILL_HOURS", "48"))
+DEFAULT_MIN_POINTS = int(os.environ.get("HISTORY_MIN_POINTS", "100"))
+RESOLUTION_PATTERN = f"^({'|'.join(RESOLUTION_CHOICES)})$"
+DEFAULT_PAGE_LIMIT = 1000
+MAX_PAGE_LIMIT = 10000
+HOURLY_AGGREGATE_FIELDS = [
+    "avg_temp", "avg_humidity", "avg_vpd", "avg_soil_moisture", "avg_co2",
+    "min_temp", "max_temp", "light_uptime_pct", "heat_uptime_pct"
+]
+
+def store_plant_data(data: dict):
+    now = datetime.utcnow()
+    sensors = data.get("sensors", {})
+    devices = data.get("devices", {})
+    
+    reading = {
+        "timestamp": now,
+        "air_temp": sensors.get("air_temp"),
+        "humidity": sensors.get("humidity"),
+        "vpd": sensors.get("vpd"),
+        "soil_moisture": sensors.get("soil_moisture"),
+        "co2": sensors.get("co2"),
+        "leaf_temp_delta": sensors.get("leaf_temp_delta")
+    }
+    # With SENSOR_COMPRESSION on, readings inside the tolerance band are not
+    # stored, but still reach the rollups, the current state and subscribers.
+    kept = sensor_compressor.offer(reading)
+    for row in kept:
+        write_buffer.add(SensorReading, row, role=None if row is reading else ARCHIVED)
+    if not any(row is reading for row in kept):
+        write_buffer.add(SensorReading, reading, role=OBSERVED)
+    
+    # Relays flip a few times a day; only the changes are written.
+    device_log.observe(now, devices)
+    
+    verdant_output = data.get("verdant_output", "")
+    if verdant_output:
+        # The same text is served for hours; store it once per change.
+        output_hash = content_hash(verdant_output.encode())
+        if pipeline.is_new("verdant_output", output_hash):
+            write_buffer.add(AIOutput, {
+                "timestamp": now,
+                "output_text": verdant_output,
+                "sol_day": data.get("sol_day"),
+                "output_hash": output_hash
+            })
+            pipeline.remember("verdant_output", output_hash)
 
-def fetch_and_store_plant_data():
+async def fetch_and_store_plant_data():
     try:
-        with httpx.Client(timeout=15) as client:
-            response = client.get(f"{EXTERNAL_API_BASE}get_status.php")
-            if response.status_code == 200:
-                data = response.json()
-                db = SessionLocal()
-                try:
-                    sensors = data.get("sensors", {})
-                    devices = data.get("devices", {})
-                    
-                    sensor_reading = SensorReading(
-                        timestamp=datetime.utcnow(),
-                        air_temp=sensors.get("air_temp"),
-                        humidity=sensors.get("humidity"),
-                        vpd=sensors.get("vpd"),
-                        soil_moisture=sensors.get("soil_moisture"),
-                        co2=sensors.get("co2"),
-                        leaf_temp_delta=sensors.get("leaf_temp_delta")
-                    )
-                    db.add(sensor_reading)
-                    
-                    device_state = DeviceState(
-                        timestamp=datetime.utcnow(),
-                        grow_light=devices.get("grow_light", False),
-                        heat_mat=devices.get("heat_mat", False),
-                        circulation_fan=devices.get("circulation_fan", False),
-                        exhaust_fan=devices.get("exhaust_fan", False),
-                        water_pump=devices.get("water_pump", False),
-                        humidifier=devices.get("humidifier", False)
-                    )
-                    db.add(device_state)
-                    
-                    verdant_output = data.get("verdant_output", "")
-                    if verdant_output:
-                        ai_output = AIOutput(
-                            timestamp=datetime.utcnow(),
-                            output_text=verdant_output,
-                            sol_day=data.get("sol_day")
-                        )
-                        db.add(ai_output)
-                    
-                    db.commit()
-                    print(f"[{datetime.now()}] Stored plant data")
-                finally:
-                    db.close()
+        response = await pipeline.fetch_changed(PLANT_SOURCE)
+        if response is not None and response.status_code == 200:
+            store_plant_data(response.json())
+            pipeline.remember(PLANT_SOURCE.name, content_hash(response.content), response)
     except Exception as e:
         print(f"Error fetching plant data: {e}")
 
-def fetch_and_store_coin_data():
+def store_coin_data(data: dict):
+    write_buffer.add(CoinMetric, {
+        "timestamp": datetime.utcnow(),
+        "market_cap": data.get("market_cap"),
+        "usd_market_cap": data.get("usd_market_cap"),
+        "holders": data.get("holder_count"),
+        "replies": data.get("reply_count"),
+        "ath_market_cap": data.get("ath_market_cap"),
+        "price": data.get("price"),
+        "volume_24h": data.get("volume_24h")
+    })
+
+async def fetch_and_store_coin_data():
     try:
-        with httpx.Client(timeout=15) as client:
-            response = client.get(PUMPFUN_API, headers={
-                "Accept": "application/json",
-                "User-Agent": "SolDashboard/1.0"
-            })
-            if response.status_code == 200:
-                data = response.json()
-                db = SessionLocal()
-                try:
-                    coin_metric = CoinMetric(
-                        timestamp=datetime.utcnow(),
-                        market_cap=data.get("market_cap"),
-                        usd_market_cap=data.get("usd_market_cap"),
-                        holders=data.get("holder_count"),
-                        replies=data.get("reply_count"),
-                        ath_market_cap=data.get("ath_market_cap"),
-                        price=data.get("price"),
-                        volume_24h=data.get("volume_24h")
-                    )
-                    db.add(coin_metric)
-                    db.commit()
-                    print(f"[{datetime.now()}] Stored coin data")
-                finally:
-                    db.close()
+        response = await pipeline.fetch_changed(COIN_SOURCE)
+        if response is not None and response.status_code == 200:
+            store_coin_data(response.json())
+            pipeline.remember(COIN_SOURCE.name, content_hash(response.content), response)
     except Exception as e:
         print(f"Error fetching coin data: {e}")
 
-def compute_hourly_aggregates():
-    db = SessionLocal()
+async def run_hourly_backfill():
+    since = datetime.utcnow() - timedelta(hours=AGGREGATE_BACKFILL_HOURS)
+    await asyncio.to_thread(hourly_rollup.backfill, since)
+    response_cache.bump()
+
+async def run_like_reconcile():
+    await asyncio.to_thread(like_counter.reconcile)
+
+async def run_stats_reconcile():
+    await asyncio.to_thread(table_stats.reconcile)
+    response_cache.bump()
+
+async def fetch_and_store_webcam_frame():
     try:
-        now = datetime.utcnow()
-        hour_start = now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
-        hour_end = hour_start + timedelta(hours=1)
-        
-        existing = db.query(HourlyAggregate).filter(HourlyAggregate.hour_start == hour_start).first()
-        if existing:
-            return
-        
-        sensors = db.query(SensorReading).filter(
-            SensorReading.timestamp >= hour_start,
-            SensorReading.timestamp < hour_end
-        ).all()
-        
-        if not sensors:
+        response = await pipeline.fetch_changed(WEBCAM_SOURCE)
+        if response is None:
             return
-        
-        devices = db.query(DeviceState).filter(
-            DeviceState.timestamp >= hour_start,
-            DeviceState.timestamp < hour_end
-        ).all()
-        
-        temps = [s.air_temp for s in sensors if s.air_temp is not None]
-        humidities = [s.humidity for s in sensors if s.humidity is not None]
-        vpds = [s.vpd for s in sensors if s.vpd is not None]
-        soils = [s.soil_moisture for s in sensors if s.soil_moisture is not None]
-        co2s = [s.co2 for s in sensors if s.co2 is not None]
-        
-        light_on = sum(1 for d in devices if d.grow_light) / max(len(devices), 1) * 100
-        heat_on = sum(1 for d in devices if d.heat_mat) / max(len(devices), 1) * 100
-        
-        aggregate = HourlyAggregate(
-            hour_start=hour_start,
-            avg_temp=np.mean(temps) if temps else None,
-            avg_humidity=np.mean(humidities) if humidities else None,
-            avg_vpd=np.mean(vpds) if vpds else None,
-            avg_soil_moisture=np.mean(soils) if soils else None,
-            avg_co2=np.mean(co2s) if co2s else None,
-            min_temp=min(temps) if temps else None,
-            max_temp=max(temps) if temps else None,
-            light_uptime_pct=light_on,
-            heat_uptime_pct=heat_on
-        )
-        db.add(aggregate)
-        db.commit()
-        print(f"[{datetime.now()}] Computed hourly aggregate for {hour_start}")
+        if response.status_code == 200:
+            content_type = response.headers.get("content-type", "image/jpeg")
+            if "image" in content_type:
+                now = datetime.utcnow()
+                frame_hash = content_hash(response.content)
+                
+                try:
+                    row = await asyncio.to_thread(frame_processor.process, response.content, now, frame_hash)
+                    if row is not None:
+                        write_buffer.add(WebcamFrame, row)
+                        print(f"[{datetime.now()}] Stored webcam frame: {row['path']} ({row['renditions'] or 'no renditions'})")
+                    pipeline.remember(WEBCAM_SOURCE.name, frame_hash, response)
+                except Exception as storage_error:
+                    print(f"Error saving webcam frame to storage: {storage_error}")
+            else:
+                print(f"Webcam response is not an image: {content_type}")
+        else:
+            print(f"Webcam fetch failed with status: {response.status_code}")
     except Exception as e:
-        print(f"Error computing aggregates: {e}")
-    finally:
-        db.close()
+        print(f"Error fetching webcam frame: {e}")
 
-def fetch_and_store_webcam_frame():
-    global latest_webcam_frame_path
+async def run_timelapse():
+    await asyncio.to_thread(timelapse_builder.catch_up)
+
+def seed_content_hashes():
+    # Start from what is already stored, so a restart does not re-write the
+    # same AI text or webcam frame.
+    if current_state.ai is not None and current_state.ai.output_text:
+        pipeline.remember("verdant_output", content_hash(current_state.ai.output_text.encode()))
+    if current_state.webcam is not None:
+        if current_state.webcam.content_hash:
+            pipeline.remember(WEBCAM_SOURCE.name, current_state.webcam.content_hash)
+        frame_processor.seed(current_state.webcam.perceptual_hash, current_state.webcam.timestamp)
+
+def refresh_after_device_import():
+    # Hours aggregated and states cached before the transitions existed saw
+    # no devices; recompute them here and have followers reload theirs.
+    hourly_rollup.refresh_uptime()
+    current_state.warm()
+    response_cache.bump()
+    coordinator.announce_refresh([DeviceTransition.__tablename__])
+
+async def start_leading():
+    # Runs in the background once this worker wins the election; the server
+    # is already accepting requests by then.
+    global leader_task
+    leader_task = asyncio.current_task()
+    # Device history is imported first: the rollups below and the warmed
+    # current state read uptime and device states from the transitions.
     try:
-        with httpx.Client(timeout=30) as client:
-            response = client.get(WEBCAM_URL)
-            if response.status_code == 200:
-                content_type = response.headers.get("content-type", "image/jpeg")
-                if "image" in content_type:
-                    now = datetime.utcnow()
-                    filename = f"webcam/frame_{now.strftime('%Y-%m-%d_%H-%M-%S')}.jpg"
-                    
-                    try:
-                        path = object_storage.save_file(
-                            content=response.content,
-                            object_path=filename,
-                            content_type="image/jpeg"
-                        )
-                        latest_webcam_frame_path = path
-                        print(f"[{datetime.now()}] Stored webcam frame: {filename}")
-                    except Exception as storage_error:
-                        print(f"Error saving webcam frame to storage: {storage_error}")
-                else:
-                    print(f"Webcam response is not an image: {content_type}")
-            else:
-                print(f"Webcam fetch failed with status: {response.status_code}")
+        if await asyncio.to_thread(import_device_states):
+            await asyncio.to_thread(refresh_after_device_import)
+            await run_stats_reconcile()
+        await asyncio.to_thread(device_log.load)
     except Exception as e:
-        print(f"Error fetching webcam frame: {e}")
+        print(f"Error loading device transitions: {e}")
+    try:
+        await asyncio.to_thread(hourly_rollup.warm)
+        await asyncio.to_thread(hourly_rollup.backfill)
+        await asyncio.to_thread(rollup_pyramid.backfill)
+    except Exception as e:
+        print(f"Error preparing rollups: {e}")
+    try:
+        await asyncio.to_thread(import_bucket_frames)
+    except Exception as e:
+        print(f"Error indexing webcam frames: {e}")
+    try:
+        await asyncio.to_thread(current_state.ensure_warm)
+        seed_content_hashes()
+    except Exception as e:
+        print(f"Error loading content hashes: {e}")
+    # Leadership may have been lost during the backfills above.
+    if not coordinator.is_leader:
+        return
+    pipeline.start_jobs()
+    
+    await asyncio.gather(
+        pipeline.run_once('plant_data'),
+        pipeline.run_once('coin_data'),
+        pipeline.run_once('webcam_frame'),
+    )
+    await asyncio.to_thread(write_buffer.flush)
+
+async def stop_leading():
+    # A demotion can arrive while start_leading is still preparing; cancel it
+    # so it never goes on to start the jobs next to the new leader.
+    if leader_task is not None and not leader_task.done():
+        leader_task.cancel()
+        await asyncio.gather(leader_task, return_exceptions=True)
+    await pipeline.stop_jobs()
+    device_log.reset()
+    store_compressor_pending()
+    frame_processor.reset()
+
+def store_compressor_pending():
+    # The reading held back as the swinging door's far end is the newest
+    # stored value the door vouches for; write it before letting go.
+    pending = sensor_compressor.reset()
+    if pending is not None:
+        write_buffer.add(SensorReading, pending, role=ARCHIVED)
+
+async def warm_caches():
+    # Endpoints also warm these lazily, so requests that arrive first are
+    # still answered; this just keeps that cost off the first visitors.
+    try:
+        await asyncio.to_thread(current_state.ensure_warm)
+        await asyncio.to_thread(like_counter.ensure_loaded)
+        await asyncio.to_thread(table_stats.ensure_loaded)
+    except Exception as e:
+        print(f"Error warming caches: {e}")
+
+async def current_snapshot(name: str):
+    # Until the background warm-up lands, the lazy load queries the database;
+    # keep it off the event loop.
+    if not current_state.warmed:
+        await asyncio.to_thread(current_state.ensure_warm)
+    return current_state.get(name)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
+    await asyncio.to_thread(Base.metadata.create_all, bind=engine)
+    await asyncio.to_thread(upgrade_schema)
+    warm_task = asyncio.create_task(warm_caches())
     
-    scheduler.add_job(fetch_and_store_plant_data, 'interval', minutes=2, id='plant_data')
-    scheduler.add_job(fetch_and_store_coin_data, 'interval', minutes=5, id='coin_data')
-    scheduler.add_job(compute_hourly_aggregates, 'interval', minutes=10, id='aggregates')
-    scheduler.add_job(fetch_and_store_webcam_frame, 'interval', minutes=2, id='webcam_frame')
-    scheduler.start()
-    
-    fetch_and_store_plant_data()
-    fetch_and_store_coin_data()
-    fetch_and_store_webcam_frame()
+    pipeline.add_job(fetch_and_store_plant_data, seconds=PLANT_POLL_SECONDS, id='plant_data')
+    pipeline.add_job(fetch_and_store_coin_data, seconds=COIN_POLL_SECONDS, id='coin_data')
+    pipeline.add_job(run_hourly_backfill, seconds=600, id='aggregates')
+    pipeline.add_job(run_like_reconcile, seconds=LIKE_RECONCILE_SECONDS, id='like_reconcile')
+    pipeline.add_job(run_stats_reconcile, seconds=STATS_RECONCILE_SECONDS, id='stats_reconcile')
+    pipeline.add_job(fetch_and_store_webcam_frame, seconds=WEBCAM_POLL_SECONDS, id='webcam_frame')
+    pipeline.add_job(run_timelapse, seconds=WEBCAM_POLL_SECONDS, id='timelapse', run_immediately=True)
+    broadcaster.start()
+    await write_buffer.start()
+    # Jobs only run in the worker that wins the election; the others serve
+    # reads and follow along over LISTEN/NOTIFY.
+    await pipeline.start(run_jobs=False)
+    coordinator.on_elected = start_leading
+    coordinator.on_demoted = stop_leading
+    coordinator.start()
     
     yield
     
-    scheduler.shutdown()
+    warm_task.cancel()
+    await coordinator.shutdown()
+    await pipeline.shutdown()
+    store_compressor_pending()
+    await write_buffer.shutdown()
+    broadcaster.close()
+    await url_signer.close()
+    await async_engine.dispose()
 
 app = FastAPI(title="Sol Dashboard API", lifespan=lifespan)
+app.add_middleware(CacheMiddleware, cache=response_cache)
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # Timestamps are stored as naive UTC; asyncpg cannot compare them with
+    # the aware values FastAPI parses from "...Z" or "+02:00".
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def query_table(db: Session, model, columns: List[str], since: datetime) -> Table:
+    rows = db.query(*[getattr(model, c) for c in columns]).filter(
+        model.timestamp >= since
+    ).order_by(model.timestamp).all()
+    return Table(columns, rows)
+
+def reconstructed_table(db: Session, since: datetime, method: str) -> Table:
+    fields = SENSOR_PYRAMID.stat_fields
+    points = load_points(db, SensorReading, fields, since)
+    # The newest collected reading may not be stored yet (it is the door's far
+    # end, or inside the deadband); either way the bound holds up to it.
+    if current_state.sensors is not None:
+        points = append_point(points, fields, asdict(current_state.sensors))
+    return reconstruct(points, fields, method, since, timedelta(seconds=PLANT_POLL_SECONDS))
+
+def reconstructed_readings(db: Session, since: datetime) -> List[SensorSnapshot]:
+    """The collected series rebuilt from compressed storage, one reading per poll interval."""
+    table = reconstructed_table(db, since, MODE_RECONSTRUCTION[sensor_compressor.mode])
+    return [SensorSnapshot.from_mapping(dict(zip(table.columns, row))) for row in table.rows]
+
+def render_page(page: Page, table: Table, format: str) -> Response:
+    response = render_table(table, format)
+    response.headers.update(page.headers())
+    return response
 
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "healthy"}
 
 @app.get("/api/sensors/latest")
-def get_latest_sensors(db: Session = Depends(get_db)):
-    reading = db.query(SensorReading).order_by(desc(SensorReading.timestamp)).first()
-    if not reading:
+async def get_latest_sensors():
+    snapshot = await current_snapshot("sensors")
+    if not snapshot:
         return {"error": "No data"}
-    return {
-        "timestamp": reading.timestamp.isoformat(),
-        "air_temp": reading.air_temp,
-        "humidity": reading.humidity,
-        "vpd": reading.vpd,
-        "soil_moisture": reading.soil_moisture,
-        "co2": reading.co2,
-        "leaf_temp_delta": reading.leaf_temp_delta
-    }
+    return snapshot.to_dict()
 
 @app.get("/api/sensors/history")
-def get_sensor_history(
+async def get_sensor_history(
+    request: Request,
     hours: int = Query(24, ge=1, le=720),
-    db: Session = Depends(get_db)
+    resolution: str = Query("auto", pattern=RESOLUTION_PATTERN),
+    min_points: int = Query(DEFAULT_MIN_POINTS, ge=1, le=10000),
+    max_points: Optional[int] = Query(None, ge=3, le=100000),
+    format: Optional[str] = Query(None, pattern=FORMAT_PATTERN),
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    reconstruct: Optional[str] = Query(None, pattern=RECONSTRUCT_PATTERN),
+    db: AsyncSession = Depends(get_async_db)
 ):
     since = datetime.utcnow() - timedelta(hours=hours)
-    readings = db.query(SensorReading).filter(
-        SensorReading.timestamp >= since
-    ).order_by(SensorReading.timestamp).all()
+    fields = SENSOR_PYRAMID.stat_fields
+    if after or before or limit:
+        page = await db.run_sync(keyset_page, SensorReading, ["timestamp"] + fields, since, after, before, limit or DEFAULT_PAGE_LIMIT)
+        response = render_page(page, downsample_table(page.table, fields, max_points), negotiate(request, format))
+        response.headers.update(error_header(sensor_compressor, None))
+        return response
     
-    return [{
-        "timestamp": r.timestamp.isoformat(),
-        "air_temp": r.air_temp,
-        "humidity": r.humidity,
-        "vpd": r.vpd,
-        "soil_moisture": r.soil_moisture,
-        "co2": r.co2,
-        "leaf_temp_delta": r.leaf_temp_delta
-    } for r in readings]
+    if resolution == "auto":
+        resolution = select_resolution(hours, min_points)
+    method = None
+    if resolution != "raw":
+        table = await db.run_sync(read_rollup, SENSOR_PYRAMID, resolution, since)
+    else:
+        method = reconstruct or MODE_RECONSTRUCTION.get(sensor_compressor.mode, "none")
+        if method != "none":
+            table = await db.run_sync(reconstructed_table, since, method)
+        else:
+            table = await db.run_sync(query_table, SensorReading, ["timestamp"] + fields, since)
+    table = downsample_table(table, fields, max_points)
+    response = render_table(table, negotiate(request, format))
+    response.headers.update(error_header(sensor_compressor, method))
+    return response
 
 @app.get("/api/devices/latest")
-def get_latest_devices(db: Session = Depends(get_db)):
-    state = db.query(DeviceState).order_by(desc(DeviceState.timestamp)).first()
-    if not state:
+async def get_latest_devices():
+    snapshot = await current_snapshot("devices")
+    if not snapshot:
         return {"error": "No data"}
-    return {
-        "timestamp": state.timestamp.isoformat(),
-        "grow_light": state.grow_light,
-        "heat_mat": state.heat_mat,
-        "circulation_fan": state.circulation_fan,
-        "exhaust_fan": state.exhaust_fan,
-        "water_pump": state.water_pump,
-        "humidifier": state.humidifier
-    }
+    return snapshot.to_dict()
 
 @app.get("/api/devices/history")
-def get_device_history(
+async def get_device_history(
+    request: Request,
     hours: int = Query(24, ge=1, le=720),
-    db: Session = Depends(get_db)
+    resolution: str = Query("auto", pattern=RESOLUTION_PATTERN),
+    min_points: int = Query(DEFAULT_MIN_POINTS, ge=1, le=10000),
+    max_points: Optional[int] = Query(None, ge=3, le=100000),
+    format: Optional[str] = Query(None, pattern=FORMAT_PATTERN),
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    db: AsyncSession = Depends(get_async_db)
 ):
     since = datetime.utcnow() - timedelta(hours=hours)
-    states = db.query(DeviceState).filter(
-        DeviceState.timestamp >= since
-    ).order_by(DeviceState.timestamp).all()
+    if after or before or limit:
+        # Pages walk the transition log itself: one row per device change.
+        page = await db.run_sync(
+            keyset_page, DeviceTransition, ["timestamp", "device", "state", "ended_at"], since,
+            after, before, limit or DEFAULT_PAGE_LIMIT
+        )
+        return render_page(page, page.table, negotiate(request, format))
     
-    return [{
-        "timestamp": s.timestamp.isoformat(),
-        "grow_light": s.grow_light,
-        "heat_mat": s.heat_mat,
-        "circulation_fan": s.circulation_fan,
-        "exhaust_fan": s.exhaust_fan,
-        "water_pump": s.water_pump,
-        "humidifier": s.humidifier
-    } for s in states]
+    if resolution == "auto":
+        resolution = select_resolution(hours, min_points)
+    if resolution != "raw":
+        table = await db.run_sync(read_device_rollup, resolution, since)
+    else:
+        table = await db.run_sync(device_history_table, since)
+    table = downsample_state_table(table, DEVICE_NAMES, max_points)
+    return render_table(table, negotiate(request, format))
+
+@app.get("/api/devices/uptime")
+async def get_device_uptime(
+    hours: int = Query(24, ge=1, le=8760),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    start, end = naive_utc(start), naive_utc(end)
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=hours)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return await db.run_sync(uptime_summary, start, end)
 
 @app.get("/api/coin/latest")
-def get_latest_coin(db: Session = Depends(get_db)):
-    metric = db.query(CoinMetric).order_by(desc(CoinMetric.timestamp)).first()
-    if not metric:
+async def get_latest_coin():
+    snapshot = await current_snapshot("coin")
+    if not snapshot:
         return {"error": "No data"}
-    return {
-        "timestamp": metric.timestamp.isoformat(),
-        "market_cap": metric.market_cap,
-        "usd_market_cap": metric.usd_market_cap,
-        "holders": metric.holders,
-        "replies": metric.replies,
-        "ath_market_cap": metric.ath_market_cap,
-        "price": metric.price,
-        "volume_24h": metric.volume_24h
-    }
+    return snapshot.to_dict()
 
 @app.get("/api/coin/history")
-def get_coin_history(
+async def get_coin_history(
+    request: Request,
     hours: int = Query(24, ge=1, le=720),
-    db: Session = Depends(get_db)
+    resolution: str = Query("auto", pattern=RESOLUTION_PATTERN),
+    min_points: int = Query(DEFAULT_MIN_POINTS, ge=1, le=10000),
+    max_points: Optional[int] = Query(None, ge=3, le=100000),
+    format: Optional[str] = Query(None, pattern=FORMAT_PATTERN),
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    db: AsyncSession = Depends(get_async_db)
 ):
     since = datetime.utcnow() - timedelta(hours=hours)
-    metrics = db.query(CoinMetric).filter(
-        CoinMetric.timestamp >= since
-    ).order_by(CoinMetric.timestamp).all()
+    fields = COIN_PYRAMID.stat_fields
+    if after or before or limit:
+        page = await db.run_sync(keyset_page, CoinMetric, ["timestamp"] + fields, since, after, before, limit or DEFAULT_PAGE_LIMIT)
+        return render_page(page, downsample_table(page.table, fields, max_points), negotiate(request, format))
     
-    return [{
-        "timestamp": m.timestamp.isoformat(),
-        "market_cap": m.market_cap,
-        "usd_market_cap": m.usd_market_cap,
-        "holders": m.holders,
-        "replies": m.replies,
-        "price": m.price
-    } for m in metrics]
+    if resolution == "auto":
+        resolution = select_resolution(hours, min_points)
+    if resolution != "raw":
+        table = await db.run_sync(read_rollup, COIN_PYRAMID, resolution, since)
+    else:
+        table = await db.run_sync(query_table, CoinMetric, ["timestamp"] + fields, since)
+    table = downsample_table(table, fields, max_points)
+    return render_table(table, negotiate(request, format))
 
 @app.get("/api/ai/latest")
-def get_latest_ai_output(db: Session = Depends(get_db)):
-    output = db.query(AIOutput).order_by(desc(AIOutput.timestamp)).first()
-    if not output:
+async def get_latest_ai_output():
+    snapshot = await current_snapshot("ai")
+    if not snapshot:
         return {"error": "No data"}
-    return {
-        "timestamp": output.timestamp.isoformat(),
-        "output_text": output.output_text,
-        "sol_day": output.sol_day
-    }
+    return snapshot.to_dict()
 
-@app.get("/api/aggregates/hourly")
-def get_hourly_aggregates(
-    hours: int = Query(24, ge=1, le=720),
-    db: Session = Depends(get_db)
-):
+def hourly_aggregate_table(db: Session, hours: int) -> Table:
     since = datetime.utcnow() - timedelta(hours=hours)
-    aggregates = db.query(HourlyAggregate).filter(
+    columns = ["hour_start"] + HOURLY_AGGREGATE_FIELDS
+    rows = db.query(*[getattr(HourlyAggregate, c) for c in columns]).filter(
         HourlyAggregate.hour_start >= since
     ).order_by(HourlyAggregate.hour_start).all()
+    return Table(columns, rows, time_column="hour_start")
+
+@app.get("/api/aggregates/hourly")
+async def get_hourly_aggregates(
+    request: Request,
+    hours: int = Query(24, ge=1, le=720),
+    max_points: Optional[int] = Query(None, ge=3, le=100000),
+    format: Optional[str] = Query(None, pattern=FORMAT_PATTERN),
+    after: Optional[str] = None,
+    before: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if after or before or limit:
+        since = datetime.utcnow() - timedelta(hours=hours)
+        page = await db.run_sync(
+            keyset_page, HourlyAggregate, ["hour_start"] + HOURLY_AGGREGATE_FIELDS, since,
+            after, before, limit or DEFAULT_PAGE_LIMIT, time_column="hour_start"
+        )
+        table = downsample_table(page.table, HOURLY_AGGREGATE_FIELDS, max_points)
+        return render_page(page, table, negotiate(request, format))
     
-    return [{
-        "hour_start": a.hour_start.isoformat(),
-        "avg_temp": a.avg_temp,
-        "avg_humidity": a.avg_humidity,
-        "avg_vpd": a.avg_vpd,
-        "avg_soil_moisture": a.avg_soil_moisture,
-        "avg_co2": a.avg_co2,
-        "min_temp": a.min_temp,
-        "max_temp": a.max_temp,
-        "light_uptime_pct": a.light_uptime_pct,
-        "heat_uptime_pct": a.heat_uptime_pct
-    } for a in aggregates]
+    table = downsample_table(await db.run_sync(hourly_aggregate_table, hours), HOURLY_AGGREGATE_FIELDS, max_points)
+    return render_table(table, negotiate(request, format))
 
 @app.get("/api/analytics/trends")
-def get_trends(
+async def get_trends(
     hours: int = Query(24, ge=1, le=720),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     since = datetime.utcnow() - timedelta(hours=hours)
-    readings = db.query(SensorReading).filter(
-        SensorReading.timestamp >= since
-    ).order_by(SensorReading.timestamp).all()
+    if sensor_compressor.enabled:
+        readings = await db.run_sync(reconstructed_readings, since)
+    else:
+        readings = (await db.execute(
+            select(SensorReading).where(SensorReading.timestamp >= since).order_by(SensorReading.timestamp)
+        )).scalars().all()
     
     if len(readings) < 2:
         return {"error": "Not enough data for trends"}
     
+    import numpy as np
+    
     temps = [r.air_temp for r in readings if r.air_temp is not None]
     humidities = [r.humidity for r in readings if r.humidity is not None]
     vpds = [r.vpd for r in readings if r.vpd is not None]
@@ -411,15 +671,18 @@ def get_trends(
     }
 
 @app.get("/api/analytics/predictions")
-def get_predictions(
+async def get_predictions(
     hours_ahead: int = Query(6, ge=1, le=24),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    readings = db.query(SensorReading).order_by(
-        desc(SensorReading.timestamp)
-    ).limit(100).all()
-    
-    readings = list(reversed(readings))
+    if sensor_compressor.enabled:
+        since = datetime.utcnow() - timedelta(seconds=PLANT_POLL_SECONDS * 100)
+        readings = (await db.run_sync(reconstructed_readings, since))[-100:]
+    else:
+        readings = (await db.execute(
+            select(SensorReading).order_by(desc(SensorReading.timestamp)).limit(100)
+        )).scalars().all()
+        readings = list(reversed(readings))
     
     if len(readings) < 10:
         return {"error": "Not enough historical data for predictions"}
@@ -427,6 +690,7 @@ def get_predictions(
     def predict_value(values, steps):
         if len(values) < 2:
             return None
+        import numpy as np
         x = np.arange(len(values))
         coeffs = np.polyfit(x, values, 1)
         future_x = len(values) + steps
@@ -459,132 +723,186 @@ def get_predictions(
     }
 
 @app.get("/api/stats")
-def get_stats(db: Session = Depends(get_db)):
-    sensor_count = db.query(func.count(SensorReading.id)).scalar()
-    device_count = db.query(func.count(DeviceState.id)).scalar()
-    coin_count = db.query(func.count(CoinMetric.id)).scalar()
-    ai_count = db.query(func.count(AIOutput.id)).scalar()
-    
-    oldest_sensor = db.query(func.min(SensorReading.timestamp)).scalar()
-    newest_sensor = db.query(func.max(SensorReading.timestamp)).scalar()
-    
-    return {
-        "total_records": {
-            "sensor_readings": sensor_count,
-            "device_states": device_count,
-            "coin_metrics": coin_count,
-            "ai_outputs": ai_count
-        },
-        "data_range": {
-            "oldest": oldest_sensor.isoformat() if oldest_sensor else None,
-            "newest": newest_sensor.isoformat() if newest_sensor else None
-        }
-    }
+async def get_stats():
+    if not table_stats.loaded:
+        await asyncio.to_thread(table_stats.ensure_loaded)
+    return table_stats.snapshot()
+
+def snapshot_part(name: str):
+    def build(db):
+        snapshot = getattr(current_state, name)
+        return snapshot.to_dict() if snapshot else None
+    return build
+
+dashboard = Dashboard(current_state)
+dashboard.add_part("sensors", snapshot_part("sensors"), depends_on=("sensors",))
+dashboard.add_part("devices", snapshot_part("devices"), depends_on=("devices",))
+dashboard.add_part("coin", snapshot_part("coin"), depends_on=("coin",))
+dashboard.add_part("ai", snapshot_part("ai"), depends_on=("ai",))
+dashboard.add_part("stats", lambda db: table_stats.snapshot(), depends_on=("sensors", "devices", "coin", "ai"))
+dashboard.add_part("hourly", lambda db: hourly_aggregate_table(db, 24).to_records(), depends_on=("sensors", "devices"))
+
+@app.get("/api/dashboard")
+def get_dashboard(since: Optional[int] = Query(None, ge=0)):
+    current_state.ensure_warm()
+    if since is not None and since == current_state.version:
+        return Response(status_code=304)
+    return dashboard.snapshot()
+
+@app.get("/api/stream")
+async def stream_events():
+    try:
+        subscriber = broadcaster.subscribe()
+    except TooManyClients:
+        raise HTTPException(status_code=503, detail="Too many stream clients")
+    return StreamingResponse(
+        broadcaster.stream(subscriber, {"version": current_state.version}),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def client_address(request: Request) -> str:
+    # Earlier entries are whatever the client sent; only the ones our own
+    # proxies appended can be trusted, so count hops from the right.
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and TRUSTED_PROXY_HOPS > 0:
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            return hops[-TRUSTED_PROXY_HOPS]
+    return request.client.host if request.client else "unknown"
 
 @app.post("/api/engagement/like")
-def add_like(message: str = "", db: Session = Depends(get_db)):
-    like = LikeEvent(
-        timestamp=datetime.utcnow(),
-        source="web",
-        message=message if message else None
-    )
-    db.add(like)
-    db.commit()
-    
-    total = db.query(func.count(LikeEvent.id)).scalar()
+def add_like(request: Request, message: str = ""):
+    if not like_limiter.allow(client_address(request)):
+        raise HTTPException(status_code=429, detail="Too many likes, slow down")
+    total = like_counter.add("web", message or None)
     return {"success": True, "total_likes": total}
 
 @app.get("/api/engagement/count")
-def get_like_count(db: Session = Depends(get_db)):
-    total = db.query(func.count(LikeEvent.id)).scalar()
-    return {"total_likes": total}
+async def get_like_count():
+    if not like_counter.loaded:
+        await asyncio.to_thread(like_counter.ensure_loaded)
+    return {"total_likes": like_counter.total}
 
 @app.get("/api/engagement/export")
-def export_likes(db: Session = Depends(get_db)):
-    likes = db.query(LikeEvent).order_by(LikeEvent.timestamp).all()
-    data = [{
-        "id": l.id,
-        "timestamp": l.timestamp.isoformat(),
-        "source": l.source,
-        "message": l.message
-    } for l in likes]
-    
-    return JSONResponse(
-        content={"likes": data, "total": len(data), "exported_at": datetime.utcnow().isoformat()},
+def export_likes(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+):
+    return StreamingResponse(
+        likes_document(naive_utc(start), naive_utc(end)),
+        media_type="application/json",
         headers={"Content-Disposition": "attachment; filename=sol_likes.json"}
     )
 
+@app.get("/api/export/{dataset}")
+def export_dataset(
+    dataset: str = Path(..., pattern=EXPORT_PATTERN),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    gzip: bool = False
+):
+    filename = f"sol_{dataset}.{format}"
+    media_type = EXPORT_FORMATS[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        export_stream(dataset, format, naive_utc(start), naive_utc(end), compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
 @app.get("/api/webcam/latest")
-def get_latest_webcam():
-    global latest_webcam_frame_path
-    if not latest_webcam_frame_path:
-        try:
-            frames = object_storage.list_files("webcam/")
-            if frames:
-                latest_webcam_frame_path = frames[0]["path"]
-        except Exception as e:
-            return {"error": f"No webcam frames available: {e}"}
-    
-    if not latest_webcam_frame_path:
+async def get_latest_webcam(
+    size: str = Query("original", pattern=FRAME_SIZE_PATTERN),
+    webp: bool = False
+):
+    frame = await current_snapshot("webcam")
+    if not frame:
         return {"error": "No webcam frames available"}
     
     try:
-        signed_url = object_storage.get_signed_url(latest_webcam_frame_path, ttl_sec=3600)
-        public_url = object_storage.get_public_url(latest_webcam_frame_path)
+        path = frame_variant_path(frame, size, webp)
+        signed_url = await url_signer.sign(path, ttl_sec=3600)
+        public_url = object_storage.get_public_url(path)
         return {
-            "path": latest_webcam_frame_path,
+            "path": path,
             "signed_url": signed_url,
             "public_url": public_url,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": frame.timestamp.isoformat()
         }
     except Exception as e:
         return {"error": f"Failed to get webcam URL: {e}"}
 
 @app.get("/api/webcam/frames")
-def list_webcam_frames(limit: int = Query(100, ge=1, le=1000)):
-    try:
-        frames = object_storage.list_files("webcam/")
-        frames = frames[:limit]
-        
-        result = []
-        for frame in frames:
-            try:
-                signed_url = object_storage.get_signed_url(frame["path"], ttl_sec=3600)
-                result.append({
-                    "path": frame["path"],
-                    "signed_url": signed_url,
-                    "size": frame.get("size"),
-                    "updated": frame.get("updated")
-                })
-            except:
-                result.append({
-                    "path": frame["path"],
-                    "size": frame.get("size"),
-                    "updated": frame.get("updated")
-                })
-        
-        return {"frames": result, "count": len(result)}
-    except Exception as e:
-        return {"error": f"Failed to list frames: {e}", "frames": [], "count": 0}
+async def list_webcam_frames(
+    limit: int = Query(100, ge=1, le=1000),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    before: Optional[str] = None,
+    size: str = Query("original", pattern=FRAME_SIZE_PATTERN),
+    webp: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    frames, next_cursor = await db.run_sync(frame_page, limit, naive_utc(start), naive_utc(end), before)
+    paths = [frame_variant_path(frame, size, webp) for frame in frames]
+    signed_urls = await url_signer.sign_many(paths, ttl_sec=3600)
+    
+    result = []
+    for frame, path in zip(frames, paths):
+        entry = {
+            "path": path,
+            "size": frame.size,
+            "updated": frame.timestamp.isoformat()
+        }
+        if signed_urls.get(path):
+            entry["signed_url"] = signed_urls[path]
+        result.append(entry)
+    
+    return {"frames": result, "count": len(result), "next_cursor": next_cursor}
 
 @app.get("/api/webcam/og-image")
-def get_og_image():
-    global latest_webcam_frame_path
-    if not latest_webcam_frame_path:
+async def get_og_image(size: str = Query("medium", pattern=FRAME_SIZE_PATTERN)):
+    # Link preview crawlers do not all read WebP, so the card stays JPEG.
+    frame = await current_snapshot("webcam")
+    if frame:
         try:
-            frames = object_storage.list_files("webcam/")
-            if frames:
-                latest_webcam_frame_path = frames[0]["path"]
-        except:
-            pass
-    
-    if latest_webcam_frame_path:
-        try:
-            signed_url = object_storage.get_signed_url(latest_webcam_frame_path, ttl_sec=86400)
+            signed_url = await url_signer.sign(frame_variant_path(frame, size), ttl_sec=86400)
             return RedirectResponse(url=signed_url, status_code=302)
-        except:
+        except Exception:
             pass
     
     return RedirectResponse(url=f"{EXTERNAL_API_BASE}get_webcam.php", status_code=302)
 
+@app.get("/api/webcam/timelapses")
+async def list_webcam_timelapses(db: AsyncSession = Depends(get_async_db)):
+    return {"timelapses": await db.run_sync(list_timelapses)}
+
+@app.get("/api/webcam/timelapse")
+async def get_webcam_timelapse(
+    day: Optional[date] = None,
+    sol: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # One artifact per day (also addressable by sol); neither gives the overview.
+    key = OVERVIEW
+    if day is not None:
+        key = day_key(day)
+    elif sol is not None:
+        key = day_key(sol_date(sol))
+    index = await db.run_sync(timelapse_index, key)
+    if index is None:
+        raise HTTPException(status_code=404, detail="No timelapse for that day")
+    try:
+        index["signed_url"] = await url_signer.sign(index["path"], ttl_sec=3600)
+    except Exception as e:
+        print(f"Error signing timelapse URL: {e}")
+    return index
+
+if isinstance(object_storage.get_backend(), object_storage.LocalBackend):
+    os.makedirs(object_storage.LOCAL_STORAGE_DIR, exist_ok=True)
+    app.mount(object_storage.LOCAL_STORAGE_URL_PREFIX, StaticFiles(directory=object_storage.LOCAL_STORAGE_DIR), name="local_storage")
+
 app.mount("/", StaticFiles(directory=".", html=True), name="static")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Measure how long the API takes to import and to answer its first request.
+
+Usage: DATABASE_URL=... python benchmarks/startup.py [--runs 5] [--port 5055]
+
+Each run starts a fresh `uvicorn api:app` process and polls /health until it
+answers, so the numbers include interpreter start-up, imports, the lifespan
+and socket bind. Results go to stdout and bench_output.txt.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY_MODULES = ["numpy", "pyarrow", "google.cloud.storage"]
+
+
+def measure_import() -> dict:
+    code = (
+        "import sys, time; t = time.perf_counter(); import api; "
+        "print(time.perf_counter() - t); "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    return {"seconds": float(output[0]), "heavy": output[1] if len(output) > 1 else ""}
+
+
+def measure_first_response(port: int, timeout: float) -> float:
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except httpx.HTTPError:
+                pass
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+            time.sleep(0.02)
+        raise TimeoutError(f"no response within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def summarize(name: str, samples: list) -> str:
+    return (f"{name}: min {min(samples):.3f}s  median {statistics.median(samples):.3f}s  "
+            f"max {max(samples):.3f}s  ({len(samples)} runs)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    if not os.environ.get("DATABASE_URL"):
+        sys.exit("DATABASE_URL must be set")
+
+    imports = [measure_import() for _ in range(args.runs)]
+    first = [measure_first_response(args.port, args.timeout) for _ in range(args.runs)]
+
+    lines = [
+        summarize("import api", [run["seconds"] for run in imports]),
+        summarize("first /health", first),
+        f"heavy modules loaded at import: {imports[-1]['heavy'] or 'none'}",
+    ]
+    report = "\n".join(lines)
+    print(report)
+    (ROOT / "bench_output.txt").write_text(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Measure object storage upload and listing throughput.
+
+Usage: python benchmarks/storage.py [--objects 2000] [--size 65536] [--threads 8]
+
+By default this runs against the local filesystem backend in a temporary
+directory, so it needs no GCS access. Set OBJECT_STORAGE_BACKEND=gcs (and the
+usual PUBLIC_OBJECT_SEARCH_PATHS) to run the same workload against the bucket;
+objects are written under a throwaway prefix. Results go to stdout and
+bench_output.txt.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import object_storage
+
+
+def measure_uploads(prefix: str, objects: int, size: int, threads: int) -> float:
+    content = os.urandom(size)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda i: object_storage.save_file(content, f"{prefix}frame_{i:06d}.jpg"), range(objects)))
+    return time.perf_counter() - started
+
+
+def measure_listing(prefix: str) -> tuple:
+    started = time.perf_counter()
+    count = sum(1 for _ in object_storage.iter_files(prefix))
+    return count, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objects", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=64 * 1024)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    backend = os.environ.get("OBJECT_STORAGE_BACKEND", "local")
+    with tempfile.TemporaryDirectory() as root:
+        if backend == "local":
+            object_storage.set_backend(object_storage.LocalBackend(root))
+        prefix = f"bench/{uuid.uuid4().hex[:8]}/"
+
+        upload_seconds = measure_uploads(prefix, args.objects, args.size, args.threads)
+        listings = [measure_listing(prefix) for _ in range(args.runs)]
+
+    megabytes = args.objects * args.size / 1e6
+    best_listing = min(seconds for _, seconds in listings)
+    lines = [
+        f"backend: {backend}  objects: {args.objects}  size: {args.size}B  threads: {args.threads}",
+        f"upload: {upload_seconds:.3f}s  {args.objects / upload_seconds:.0f} objects/s  {megabytes / upload_seconds:.1f} MB/s",
+        f"list: {best_listing:.3f}s  {listings[-1][0] / best_listing:.0f} objects/s  (best of {args.runs})",
+    ]
+    if backend != "local":
+        lines.append(f"note: benchmark objects left under {prefix}")
+    report = "\n".join(lines)
+    print(report)
+    (ROOT / "bench_output.txt").write_text(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Deadband and swinging-door compression of sensor readings at ingest, and reconstruction on read."""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import desc
+
+from formats import Table
+
+COMPRESSION_MODES = ["off", "deadband", "swinging_door"]
+RECONSTRUCT_CHOICES = ["step", "linear", "none"]
+RECONSTRUCT_PATTERN = f"^({'|'.join(RECONSTRUCT_CHOICES)})$"
+# Each mode's error bound holds for the reconstruction that matches it.
+MODE_RECONSTRUCTION = {"deadband": "step", "swinging_door": "linear"}
+
+SENSOR_COMPRESSION = os.environ.get("SENSOR_COMPRESSION", "off")
+# "field=tolerance,..." in sensor units; fields left out only tolerate no change.
+SENSOR_TOLERANCES = os.environ.get(
+    "SENSOR_TOLERANCES", "air_temp=0.1,humidity=0.5,vpd=0.02,soil_moisture=0.5,co2=5,leaf_temp_delta=0.1"
+)
+SENSOR_HEARTBEAT_SECONDS = float(os.environ.get("SENSOR_HEARTBEAT_SECONDS", "900"))
+
+
+def parse_tolerances(spec: str) -> Dict[str, float]:
+    tolerances = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            tolerances[name.strip()] = float(value)
+    return tolerances
+
+
+class SensorCompressor:
+    """Decides which readings to store; offer() returns the rows to write, possibly none."""
+
+    def __init__(self, fields: List[str], mode: str = SENSOR_COMPRESSION,
+                 tolerances: Optional[Dict[str, float]] = None, heartbeat: float = SENSOR_HEARTBEAT_SECONDS):
+        if mode not in COMPRESSION_MODES:
+            raise ValueError(f"Unknown sensor compression mode: {mode}")
+        self.fields = fields
+        self.mode = mode
+        if tolerances is None:
+            tolerances = parse_tolerances(SENSOR_TOLERANCES)
+        self.tolerances = {name: tolerances.get(name, 0.0) for name in fields}
+        self.heartbeat = timedelta(seconds=heartbeat)
+        self.offered = 0
+        self.stored = 0
+        self._pivot: Optional[dict] = None
+        self._pending: Optional[dict] = None
+        self._low: Dict[str, float] = {}
+        self._high: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    def error_bounds(self) -> Dict[str, float]:
+        return dict(self.tolerances)
+
+    def reset(self) -> Optional[dict]:
+        """Start from a fresh pivot; returns the reading held back for the door, which the caller should store."""
+        # Another worker may store readings from here on.
+        with self._lock:
+            pending = self._pending
+            self._pivot = None
+            self._pending = None
+            self._low = {}
+            self._high = {}
+            if pending is not None:
+                self.stored += 1
+            return pending
+
+    def _archive(self, row: dict, kept: List[dict]):
+        kept.append(row)
+        self._pivot = row
+        self._pending = None
+        self._low = {}
+        self._high = {}
+
+    def _deadband(self, values: dict, kept: List[dict]):
+        pivot = self._pivot
+        for name in self.fields:
+            value, stored = values.get(name), pivot.get(name)
+            if (value is None) != (stored is None) or (value is not None and abs(value - stored) > self.tolerances[name]):
+                self._archive(values, kept)
+                return
+
+    def _fits_door(self, values: dict) -> bool:
+        """Whether the straight line from the pivot to values stays within tolerance of every skipped reading."""
+        pivot = self._pivot
+        elapsed = (values["timestamp"] - pivot["timestamp"]).total_seconds()
+        if elapsed <= 0:
+            return False
+        for name in self.fields:
+            value, start = values.get(name), pivot.get(name)
+            if (value is None) != (start is None):
+                return False
+            if value is None:
+                continue
+            slope = (value - start) / elapsed
+            if slope < self._low.get(name, float("-inf")) or slope > self._high.get(name, float("inf")):
+                return False
+        return True
+
+    def _narrow_door(self, values: dict):
+        pivot = self._pivot
+        elapsed = (values["timestamp"] - pivot["timestamp"]).total_seconds()
+        for name in self.fields:
+            value, start = values.get(name), pivot.get(name)
+            if value is None:
+                continue
+            tolerance = self.tolerances[name]
+            self._low[name] = max(self._low.get(name, float("-inf")), (value - tolerance - start) / elapsed)
+            self._high[name] = min(self._high.get(name, float("inf")), (value + tolerance - start) / elapsed)
+
+    def _swinging_door(self, values: dict, kept: List[dict]):
+        if not self._fits_door(values):
+            if self._pending is not None:
+                # The last reading that still fit becomes the next pivot.
+                self._archive(self._pending, kept)
+            if not self._fits_door(values):
+                self._archive(values, kept)
+                return
+        self._narrow_door(values)
+        self._pending = values
+
+    def offer(self, values: dict) -> List[dict]:
+        with self._lock:
+            self.offered += 1
+            if not self.enabled:
+                self.stored += 1
+                return [values]
+            kept: List[dict] = []
+            if self._pivot is None:
+                self._archive(values, kept)
+            elif values["timestamp"] - self._pivot["timestamp"] >= self.heartbeat:
+                if self._pending is not None:
+                    kept.append(self._pending)
+                self._archive(values, kept)
+            elif self.mode == "deadband":
+                self._deadband(values, kept)
+            else:
+                self._swinging_door(values, kept)
+            self.stored += len(kept)
+            return kept
+
+
+def load_points(db, model, fields: List[str], since: datetime) -> Table:
+    """Stored rows since `since`, led by the last row before it so the window starts with a known value."""
+    columns = [model.timestamp] + [getattr(model, name) for name in fields]
+    previous = db.query(*columns).filter(model.timestamp < since).order_by(desc(model.timestamp)).first()
+    rows = db.query(*columns).filter(model.timestamp >= since).order_by(model.timestamp).all()
+    return Table(["timestamp"] + fields, ([previous] if previous else []) + rows)
+
+
+def append_point(points: Table, fields: List[str], row: dict) -> Table:
+    """points with row added at the end when it is newer than every point, e.g. the newest collected reading."""
+    if len(points) and row["timestamp"] <= points.rows[-1][0]:
+        return points
+    return Table(points.columns, list(points.rows) + [tuple([row["timestamp"]] + [row.get(name) for name in fields])])
+
+
+def reconstruct(points: Table, fields: List[str], method: str, since: datetime, step: timedelta) -> Table:
+    """Resample points onto a regular grid, holding (step) or interpolating (linear) between them.
+
+    The grid ends at the last point: past it nothing is known, so no error bound can be claimed.
+    """
+    if len(points) == 0:
+        return points
+    import numpy as np
+    start = max(since, points.rows[0][0])
+    count = int((points.rows[-1][0] - start) / step) + 1
+    grid = [start + step * i for i in range(count)]
+    x = points.epoch_ms().astype(np.float64)
+    gx = np.array(grid, dtype="datetime64[ms]").astype(np.int64).astype(np.float64)
+    # Index of the last stored point at or before each grid time.
+    held = np.searchsorted(x, gx, side="right") - 1
+    columns = []
+    for name in fields:
+        y = np.array(points.column(name), dtype=np.float64)
+        values = y[held]
+        if method == "linear":
+            # Only interpolate between two stored values; gaps (None) stay gaps.
+            following = np.minimum(held + 1, len(x) - 1)
+            span = x[following] - x[held]
+            inside = (following > held) & ~np.isnan(y[held]) & ~np.isnan(y[following])
+            fraction = np.divide(gx - x[held], span, out=np.zeros_like(gx), where=span > 0)
+            values = np.where(inside, y[held] + (y[following] - y[held]) * fraction, values)
+        columns.append([None if np.isnan(value) else float(value) for value in values])
+    return Table(["timestamp"] + fields, list(zip(grid, *columns)))
+
+
+def error_header(compressor: SensorCompressor, method: Optional[str]) -> Dict[str, str]:
+    """Response headers describing how far a reconstructed series may stray from the collected one."""
+    headers = {"X-Sensor-Compression": compressor.mode}
+    if not compressor.enabled or method is None:
+        return headers
+    if MODE_RECONSTRUCTION[compressor.mode] == method:
+        headers["X-Sensor-Max-Error"] = ",".join(f"{name}={value:g}" for name, value in compressor.error_bounds().items())
+    else:
+        headers["X-Sensor-Max-Error"] = "unbounded"
+    return headers
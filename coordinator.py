@@ -0,0 +1,206 @@
+"""Leader election over a Postgres advisory lock, and LISTEN/NOTIFY fan-out of flushed rows."""
+
+import asyncio
+import json
+import os
+import select
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import DateTime, func, select as sql_select
+
+from database import Base, engine
+
+LEADER_LOCK_KEY = int(os.environ.get("LEADER_LOCK_KEY", "7263041"))
+LEADER_RETRY_SECONDS = float(os.environ.get("LEADER_RETRY_SECONDS", "5"))
+NOTIFY_CHANNEL = os.environ.get("NOTIFY_CHANNEL", "sol_dashboard")
+# Postgres rejects NOTIFY payloads of 8000 bytes or more.
+NOTIFY_MAX_PAYLOAD = 7800
+
+BatchListener = Callable[[Dict[type, List[dict]]], None]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _datetime_columns(model) -> List[str]:
+    return [column.name for column in model.__table__.columns if isinstance(column.type, DateTime)]
+
+
+class Coordinator:
+    """Every worker serves reads; only the one holding the lock runs the ingestion jobs."""
+
+    def __init__(self, lock_key: int = LEADER_LOCK_KEY, channel: str = NOTIFY_CHANNEL,
+                 retry_seconds: float = LEADER_RETRY_SECONDS):
+        self.lock_key = lock_key
+        self.channel = channel
+        self.retry_seconds = retry_seconds
+        self.origin = uuid.uuid4().hex[:12]
+        self.is_leader = False
+        self.on_elected: Optional[Callable[[], Awaitable[None]]] = None
+        self.on_demoted: Optional[Callable[[], Awaitable[None]]] = None
+        self.listeners: List[BatchListener] = []
+        self.refresh_listeners: List[Callable[[List[str]], None]] = []
+        self._models = {mapper.class_.__tablename__: mapper.class_ for mapper in Base.registry.mappers}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def add_listener(self, fn: BatchListener):
+        """fn(batch) is called for rows flushed by other workers."""
+        self.listeners.append(fn)
+
+    def add_refresh_listener(self, fn: Callable[[List[str]], None]):
+        """fn(table_names) is called when another worker's rows were too large to relay."""
+        self.refresh_listeners.append(fn)
+
+    def _payloads(self, batch: Dict[type, List[dict]]) -> List[str]:
+        payloads = []
+        rows: Dict[str, List[str]] = {}
+        size = 0
+        refresh = set()
+        head = f'{{"origin":"{self.origin}","rows":{{'
+
+        def emit():
+            body = ",".join(f'"{name}":[{",".join(encoded)}]' for name, encoded in rows.items())
+            payloads.append(head + body + "}}")
+
+        for model, values in batch.items():
+            name = model.__tablename__
+            for row in values:
+                encoded = json.dumps(row, default=_json_default, separators=(",", ":"))
+                if len(head) + len(name) + len(encoded) + 16 > NOTIFY_MAX_PAYLOAD:
+                    refresh.add(name)
+                    continue
+                if rows and len(head) + size + len(name) + len(encoded) + 16 > NOTIFY_MAX_PAYLOAD:
+                    emit()
+                    rows = {}
+                    size = 0
+                if name not in rows:
+                    rows[name] = []
+                    size += len(name) + 6
+                rows[name].append(encoded)
+                size += len(encoded) + 1
+        if rows:
+            emit()
+        if refresh:
+            payloads.append(json.dumps({"origin": self.origin, "refresh": sorted(refresh)}))
+        return payloads
+
+    def on_flush(self, db, batch: Dict[type, List[dict]]):
+        # Runs as a write-buffer hook: NOTIFY is transactional, so followers
+        # hear about exactly the batches that commit.
+        for payload in self._payloads(batch):
+            db.execute(sql_select(func.pg_notify(self.channel, payload)))
+
+    def announce_refresh(self, tables: List[str]):
+        """Ask followers to reload the given tables, for changes made outside the write buffer."""
+        payload = json.dumps({"origin": self.origin, "refresh": sorted(tables)})
+        with engine.begin() as conn:
+            conn.execute(sql_select(func.pg_notify(self.channel, payload)))
+
+    def _decode_rows(self, rows: Dict[str, List[dict]]) -> Dict[type, List[dict]]:
+        batch = {}
+        for name, values in rows.items():
+            model = self._models.get(name)
+            if model is None:
+                continue
+            for column in _datetime_columns(model):
+                for row in values:
+                    if row.get(column):
+                        row[column] = datetime.fromisoformat(row[column])
+            batch[model] = values
+        return batch
+
+    def _handle(self, payload: str):
+        message = json.loads(payload)
+        if message.get("origin") == self.origin:
+            return
+        if "rows" in message:
+            batch = self._decode_rows(message["rows"])
+            for listener in self.listeners:
+                try:
+                    listener(batch)
+                except Exception as e:
+                    print(f"Error in replica listener: {e}")
+        if "refresh" in message:
+            for listener in self.refresh_listeners:
+                try:
+                    listener(message["refresh"])
+                except Exception as e:
+                    print(f"Error in refresh listener: {e}")
+
+    def _set_leader(self, leader: bool):
+        if leader == self.is_leader:
+            return
+        self.is_leader = leader
+        print(f"[{datetime.now()}] Worker {self.origin} {'elected leader' if leader else 'lost leadership'}")
+        callback = self.on_elected if leader else self.on_demoted
+        if callback is not None and self._loop is not None:
+            asyncio.run_coroutine_threadsafe(callback(), self._loop)
+
+    def _session(self):
+        # A dedicated connection outside the pool: the advisory lock lives
+        # exactly as long as this connection does.
+        pooled = engine.raw_connection()
+        conn = pooled.driver_connection
+        pooled.detach()
+        conn.autocommit = True
+        cursor = conn.cursor()
+        cursor.execute(f'LISTEN "{self.channel}"')
+        last_attempt = 0.0
+        try:
+            while not self._stopped.is_set():
+                now = time.monotonic()
+                if now - last_attempt >= self.retry_seconds:
+                    last_attempt = now
+                    if self.is_leader:
+                        cursor.execute("SELECT 1")
+                    else:
+                        cursor.execute("SELECT pg_try_advisory_lock(%s)", (self.lock_key,))
+                        if cursor.fetchone()[0]:
+                            self._set_leader(True)
+                readable, _, _ = select.select([conn], [], [], self.retry_seconds)
+                if readable:
+                    conn.poll()
+                    while conn.notifies:
+                        self._handle(conn.notifies.pop(0).payload)
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._session()
+            except Exception as e:
+                print(f"Coordinator connection error: {e}")
+            if self._stopped.is_set():
+                self.is_leader = False
+                break
+            # Losing the connection releases the lock; stop leading before
+            # another worker picks it up.
+            self._set_leader(False)
+            self._stopped.wait(self.retry_seconds)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="coordinator", daemon=True)
+        self._thread.start()
+
+    async def shutdown(self):
+        self._stopped.set()
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, self.retry_seconds * 2)
+            self._thread = None
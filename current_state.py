@@ -0,0 +1,166 @@
+"""In-process store of the newest sensor, device, coin, AI and webcam snapshot."""
+
+import threading
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import desc
+
+from database import SessionLocal
+from devices import open_states
+from models import SensorReading, DeviceTransition, CoinMetric, AIOutput, WebcamFrame
+from write_buffer import observed_rows
+
+
+class Snapshot:
+    @classmethod
+    def from_mapping(cls, values: dict):
+        return cls(**{f.name: values.get(f.name) for f in fields(cls)})
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(**{f.name: getattr(row, f.name) for f in fields(cls)})
+
+    def to_dict(self) -> dict:
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        data["timestamp"] = self.timestamp.isoformat()
+        return data
+
+
+@dataclass(frozen=True)
+class SensorSnapshot(Snapshot):
+    timestamp: datetime
+    air_temp: Optional[float] = None
+    humidity: Optional[float] = None
+    vpd: Optional[float] = None
+    soil_moisture: Optional[float] = None
+    co2: Optional[float] = None
+    leaf_temp_delta: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class DeviceSnapshot(Snapshot):
+    timestamp: datetime
+    grow_light: bool = False
+    heat_mat: bool = False
+    circulation_fan: bool = False
+    exhaust_fan: bool = False
+    water_pump: bool = False
+    humidifier: bool = False
+
+
+@dataclass(frozen=True)
+class CoinSnapshot(Snapshot):
+    timestamp: datetime
+    market_cap: Optional[float] = None
+    usd_market_cap: Optional[float] = None
+    holders: Optional[int] = None
+    replies: Optional[int] = None
+    ath_market_cap: Optional[float] = None
+    price: Optional[float] = None
+    volume_24h: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class AISnapshot(Snapshot):
+    timestamp: datetime
+    output_text: Optional[str] = None
+    sol_day: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class WebcamSnapshot(Snapshot):
+    timestamp: datetime
+    path: Optional[str] = None
+    size: Optional[int] = None
+    content_hash: Optional[str] = None
+    perceptual_hash: Optional[str] = None
+    renditions: Optional[str] = None
+
+
+SNAPSHOT_TYPES = {
+    SensorReading: ("sensors", SensorSnapshot),
+    CoinMetric: ("coin", CoinSnapshot),
+    AIOutput: ("ai", AISnapshot),
+    WebcamFrame: ("webcam", WebcamSnapshot),
+}
+
+
+class CurrentState:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.sensors: Optional[SensorSnapshot] = None
+        self.devices: Optional[DeviceSnapshot] = None
+        self.coin: Optional[CoinSnapshot] = None
+        self.ai: Optional[AISnapshot] = None
+        self.webcam: Optional[WebcamSnapshot] = None
+        # Seeded from the clock so version tokens handed out by a previous
+        # process never match this one's.
+        self.version = int(time.time() * 1000)
+        self.versions: Dict[str, int] = {name: 0 for name, _ in SNAPSHOT_TYPES.values()}
+        self.versions["devices"] = 0
+        self.warmed = False
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock()
+
+    def _set(self, name: str, snapshot: Snapshot) -> bool:
+        current = getattr(self, name)
+        if current is not None and current.timestamp > snapshot.timestamp:
+            return False
+        setattr(self, name, snapshot)
+        self.versions[name] += 1
+        return True
+
+    def _apply_transitions(self, rows: List[dict]) -> bool:
+        # Transitions carry one device each; fold them into the full vector.
+        current = self.devices
+        values = current.to_dict() if current is not None else {}
+        for row in sorted(rows, key=lambda values: values["timestamp"]):
+            values[row["device"]] = row["state"]
+        values["timestamp"] = max(rows, key=lambda values: values["timestamp"])["timestamp"]
+        return self._set("devices", DeviceSnapshot.from_mapping(values))
+
+    def on_flush(self, batch: Dict[type, List[dict]]):
+        with self._lock:
+            changed = False
+            for model, (name, snapshot_type) in SNAPSHOT_TYPES.items():
+                rows = observed_rows(batch.get(model, []))
+                if rows:
+                    newest = max(rows, key=lambda values: values["timestamp"])
+                    changed = self._set(name, snapshot_type.from_mapping(newest)) or changed
+            if batch.get(DeviceTransition):
+                changed = self._apply_transitions(batch[DeviceTransition]) or changed
+            if changed:
+                self.version += 1
+
+    def warm(self):
+        """Load the newest row of each table; only needed on a cold start."""
+        db = self.session_factory()
+        try:
+            loaded = {}
+            for model, (name, snapshot_type) in SNAPSHOT_TYPES.items():
+                row = db.query(model).order_by(desc(model.timestamp)).first()
+                if row is not None:
+                    loaded[name] = snapshot_type.from_row(row)
+            states, changed_at = open_states(db)
+            if changed_at is not None:
+                loaded["devices"] = DeviceSnapshot.from_mapping({**states, "timestamp": changed_at})
+        finally:
+            db.close()
+        with self._lock:
+            for name, snapshot in loaded.items():
+                self._set(name, snapshot)
+            self.warmed = True
+            self.version += 1
+
+    def ensure_warm(self):
+        if not self.warmed:
+            with self._warm_lock:
+                if not self.warmed:
+                    self.warm()
+
+    def get(self, name: str) -> Optional[Snapshot]:
+        self.ensure_warm()
+        return getattr(self, name)
@@ -0,0 +1,57 @@
+"""Composite dashboard payload assembled from parts cached against data versions."""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from current_state import CurrentState
+from database import SessionLocal
+
+
+@dataclass
+class Part:
+    name: str
+    build: Callable[[Any], Any]
+    depends_on: Tuple[str, ...]
+    key: Optional[Tuple[int, ...]] = None
+    value: Any = None
+
+
+class Dashboard:
+    def __init__(self, state: CurrentState, session_factory=SessionLocal):
+        self.state = state
+        self.session_factory = session_factory
+        self.parts: Dict[str, Part] = {}
+        self._lock = threading.Lock()
+        self._payload: Optional[dict] = None
+        self._payload_version: Optional[int] = None
+
+    def add_part(self, name: str, build: Callable[[Any], Any], depends_on: Tuple[str, ...]):
+        self.parts[name] = Part(name=name, build=build, depends_on=depends_on)
+
+    def _key(self, part: Part) -> Tuple[int, ...]:
+        return tuple(self.state.versions[name] for name in part.depends_on)
+
+    def snapshot(self) -> dict:
+        self.state.ensure_warm()
+        with self._lock:
+            version = self.state.version
+            if self._payload is not None and self._payload_version == version:
+                return self._payload
+
+            stale = [part for part in self.parts.values() if part.key != self._key(part)]
+            if stale:
+                db = self.session_factory()
+                try:
+                    for part in stale:
+                        # Read the key before building so a concurrent update
+                        # leaves the part stale rather than marked fresh.
+                        key = self._key(part)
+                        part.value = part.build(db)
+                        part.key = key
+                finally:
+                    db.close()
+
+            self._payload = {"version": version, **{name: part.value for name, part in self.parts.items()}}
+            self._payload_version = version
+            return self._payload
@@ -1,16 +1,65 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# create_all only creates missing tables; columns added to existing tables
+# are applied here, and every statement must be safe to re-run.
+SCHEMA_UPGRADES = [
+    "ALTER TABLE ai_outputs ADD COLUMN IF NOT EXISTS output_hash VARCHAR(64)",
+    # Repeats are skipped only when consecutive, so an output that comes back
+    # after another one is stored again.
+    "DROP INDEX IF EXISTS idx_ai_output_hash",
+    "CREATE INDEX IF NOT EXISTS idx_ai_outputs_output_hash ON ai_outputs (output_hash)",
+    "ALTER TABLE webcam_frames ADD COLUMN IF NOT EXISTS perceptual_hash VARCHAR(16)",
+    "ALTER TABLE webcam_frames ADD COLUMN IF NOT EXISTS renditions VARCHAR(200)",
+]
+
+POOL_OPTIONS = {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+    "pool_timeout": DB_POOL_TIMEOUT,
+    "pool_recycle": DB_POOL_RECYCLE,
+    "pool_pre_ping": DB_POOL_PRE_PING,
+}
+
+def async_database_url(url: str):
+    """The same database through asyncpg, which spells libpq's sslmode as ssl."""
+    url = make_url(url).set(drivername="postgresql+asyncpg")
+    if "sslmode" in url.query:
+        query = dict(url.query)
+        query["ssl"] = query.pop("sslmode")
+        url = url.set(query=query)
+    return url
+
+engine = create_engine(DATABASE_URL, **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = create_async_engine(async_database_url(DATABASE_URL), **POOL_OPTIONS)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+def upgrade_schema():
+    with engine.begin() as conn:
+        for statement in SCHEMA_UPGRADES:
+            conn.execute(text(statement))
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
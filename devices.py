@@ -0,0 +1,202 @@
+"""Device states as a transition log: one row per change, read back as exact intervals."""
+
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, or_, text
+
+from database import SessionLocal
+from formats import Table
+from likes import increment_counter
+from models import Counter, DeviceTransition
+
+DEVICE_NAMES = ["grow_light", "heat_mat", "circulation_fan", "exhaust_fan", "water_pump", "humidifier"]
+DEVICE_IMPORT_MARKER = "device_state_import"
+
+# (entered, left or None while still in that state, state)
+Interval = Tuple[datetime, Optional[datetime], bool]
+
+# Every open interval that has a later transition for the same device ends
+# where that transition starts. Only open rows are scanned, so this stays a
+# handful of rows however long the log grows.
+CLOSE_INTERVALS_SQL = """
+UPDATE device_transitions AS t SET ended_at = n.next_start
+FROM (
+    SELECT id, lead(timestamp) OVER (PARTITION BY device ORDER BY timestamp, id) AS next_start
+    FROM device_transitions WHERE ended_at IS NULL
+) AS n
+WHERE t.id = n.id AND n.next_start IS NOT NULL
+"""
+
+# Collapse the old per-poll snapshots into runs: keep a snapshot's value only
+# where it differs from the previous snapshot of the same device.
+IMPORT_SQL = f"""
+INSERT INTO device_transitions (timestamp, device, state, ended_at)
+SELECT timestamp, device, state, lead(timestamp) OVER (PARTITION BY device ORDER BY timestamp)
+FROM (
+    SELECT s.timestamp, d.device, d.state,
+           lag(d.state) OVER (PARTITION BY d.device ORDER BY s.timestamp, s.id) AS previous
+    FROM device_states AS s
+    CROSS JOIN LATERAL (VALUES {", ".join(f"('{name}', s.{name})" for name in DEVICE_NAMES)}) AS d(device, state)
+    WHERE s.timestamp IS NOT NULL AND s.timestamp < :before
+) AS runs
+WHERE previous IS DISTINCT FROM state
+"""
+
+
+def close_intervals(db):
+    db.execute(text(CLOSE_INTERVALS_SQL))
+
+
+def open_states(db) -> Tuple[Dict[str, bool], Optional[datetime]]:
+    """The current state of every logged device and when the newest of them began."""
+    rows = db.query(DeviceTransition).filter(DeviceTransition.ended_at.is_(None)).order_by(DeviceTransition.timestamp).all()
+    states = {row.device: row.state for row in rows}
+    return states, rows[-1].timestamp if rows else None
+
+
+def import_device_states(session_factory=SessionLocal, force: bool = False) -> int:
+    """One-time conversion of the 2-minute device_states snapshots into transitions."""
+    db = session_factory()
+    try:
+        if not force and db.get(Counter, DEVICE_IMPORT_MARKER) is not None:
+            return 0
+        first = db.query(func.min(DeviceTransition.timestamp)).scalar()
+        imported = db.execute(text(IMPORT_SQL), {"before": first or datetime.max}).rowcount
+        close_intervals(db)
+        increment_counter(db, DEVICE_IMPORT_MARKER, imported)
+        db.commit()
+        print(f"[{datetime.now()}] Converted device snapshots into {imported} transitions")
+        return imported
+    finally:
+        db.close()
+
+
+class DeviceLog:
+    """Turns polled device states into transition rows, written only when a device changes."""
+
+    def __init__(self, write_buffer, session_factory=SessionLocal):
+        self.write_buffer = write_buffer
+        self.session_factory = session_factory
+        self._states: Optional[Dict[str, bool]] = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        db = self.session_factory()
+        try:
+            states, _ = open_states(db)
+        finally:
+            db.close()
+        with self._lock:
+            self._states = states
+
+    def reset(self):
+        # Another worker may log transitions while we follow; reload on re-election.
+        with self._lock:
+            self._states = None
+
+    def observe(self, timestamp: datetime, values: dict) -> int:
+        if self._states is None:
+            self.load()
+        changed = 0
+        with self._lock:
+            for name in DEVICE_NAMES:
+                state = bool(values.get(name, False))
+                if self._states.get(name) == state:
+                    continue
+                self._states[name] = state
+                self.write_buffer.add(DeviceTransition, {"timestamp": timestamp, "device": name, "state": state})
+                changed += 1
+        return changed
+
+    def on_flush(self, db, batch: Dict[type, List[dict]]):
+        # Runs as a write-buffer hook, so the previous interval is closed in
+        # the same transaction that opens the next one.
+        if batch.get(DeviceTransition):
+            close_intervals(db)
+
+
+def load_intervals(db, start: datetime, end: datetime, devices: Optional[List[str]] = None) -> Dict[str, List[Interval]]:
+    """Intervals overlapping [start, end), oldest first, per device."""
+    query = db.query(DeviceTransition.device, DeviceTransition.timestamp, DeviceTransition.ended_at, DeviceTransition.state).filter(
+        DeviceTransition.timestamp < end,
+        or_(DeviceTransition.ended_at.is_(None), DeviceTransition.ended_at > start)
+    )
+    if devices is not None:
+        query = query.filter(DeviceTransition.device.in_(devices))
+    intervals: Dict[str, List[Interval]] = {}
+    for device, entered, left, state in query.order_by(DeviceTransition.timestamp, DeviceTransition.id):
+        intervals.setdefault(device, []).append((entered, left, state))
+    return intervals
+
+
+def bucket_durations(intervals: Dict[str, List[Interval]], start: datetime, end: datetime, step: timedelta,
+                     now: Optional[datetime] = None) -> List[Tuple[datetime, Dict[str, Tuple[float, float]]]]:
+    """Seconds (on, known) per device for each bucket of [start, end); open intervals end at now."""
+    now = now or datetime.utcnow()
+    end = min(end, now)
+    starts = []
+    bucket = start
+    while bucket < end:
+        starts.append(bucket)
+        bucket += step
+    durations = [{name: [0.0, 0.0] for name in intervals} for _ in starts]
+    for device, spans in intervals.items():
+        for entered, left, state in spans:
+            lo = max(entered, start)
+            hi = min(left or now, end)
+            index = max(int((lo - start) / step), 0)
+            while lo < hi and index < len(starts):
+                bucket_end = starts[index] + step
+                seconds = (min(hi, bucket_end) - max(lo, starts[index])).total_seconds()
+                if seconds > 0:
+                    durations[index][device][1] += seconds
+                    if state:
+                        durations[index][device][0] += seconds
+                if bucket_end >= hi:
+                    break
+                index += 1
+    return [(bucket, {name: (on, known) for name, (on, known) in entry.items()}) for bucket, entry in zip(starts, durations)]
+
+
+def duty_cycle(on: float, known: float) -> Optional[float]:
+    return on / known * 100 if known else None
+
+
+def device_history_table(db, since: datetime, now: Optional[datetime] = None) -> Table:
+    """One row per change point since `since`, each carrying the full state vector."""
+    now = now or datetime.utcnow()
+    changes: Dict[datetime, Dict[str, bool]] = {}
+    for device, spans in load_intervals(db, since, now).items():
+        for entered, _, state in spans:
+            changes.setdefault(max(entered, since), {})[device] = state
+    rows = []
+    current: Dict[str, Optional[bool]] = {name: None for name in DEVICE_NAMES}
+    for timestamp in sorted(changes):
+        current.update(changes[timestamp])
+        rows.append((timestamp, *[current[name] for name in DEVICE_NAMES]))
+    if rows and rows[-1][0] < now:
+        # Close the series at the present so step charts run to the right edge.
+        rows.append((now, *rows[-1][1:]))
+    return Table(["timestamp"] + DEVICE_NAMES, rows)
+
+
+def uptime_summary(db, start: datetime, end: datetime) -> dict:
+    """Exact on-time and duty cycle per device over [start, end)."""
+    now = datetime.utcnow()
+    intervals = load_intervals(db, start, end)
+    buckets = bucket_durations(intervals, start, end, max(end - start, timedelta(seconds=1)), now)
+    durations = buckets[0][1] if buckets else {}
+    devices = {}
+    for name in DEVICE_NAMES:
+        on, known = durations.get(name, (0.0, 0.0))
+        spans = intervals.get(name, [])
+        devices[name] = {
+            "on_seconds": round(on, 3),
+            "known_seconds": round(known, 3),
+            "duty_cycle_pct": duty_cycle(on, known),
+            "transitions": sum(1 for entered, _, _ in spans if start <= entered < end),
+            "state": spans[-1][2] if spans else None,
+        }
+    return {"start": start.isoformat(), "end": min(end, now).isoformat(), "devices": devices}
@@ -0,0 +1,85 @@
+"""Point-budget downsampling for chart series: LTTB for numbers, change points for booleans."""
+
+from typing import TYPE_CHECKING, List, Optional
+
+from formats import Table
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def lttb_indices(x: "np.ndarray", y: "np.ndarray", n_out: int) -> "np.ndarray":
+    """Largest-Triangle-Three-Buckets; returns the indices of the points to keep."""
+    import numpy as np
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket boundaries for the n - 2 interior points, and every bucket's mean,
+    # are computed up front; only the dependency on the previously chosen point
+    # is resolved bucket by bucket.
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+    x_sums = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    y_sums = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    x_means = np.append(x_sums / np.maximum(counts, 1), x[-1])
+    y_means = np.append(y_sums / np.maximum(counts, 1), y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if end <= start:
+            selected[i + 1] = start
+            prev = start
+            continue
+        bx = x[start:end]
+        by = y[start:end]
+        areas = np.abs(
+            (x[prev] - x_means[i + 1]) * (by - y[prev])
+            - (x[prev] - bx) * (y_means[i + 1] - y[prev])
+        )
+        prev = start + int(np.argmax(areas))
+        selected[i + 1] = prev
+    return np.unique(selected)
+
+
+def change_point_indices(states: "np.ndarray", n_out: int) -> "np.ndarray":
+    """Keep the first and last rows plus both sides of every state change."""
+    import numpy as np
+    n = len(states)
+    if n <= n_out:
+        return np.arange(n)
+    changed = np.flatnonzero(np.any(states[1:] != states[:-1], axis=1)) + 1
+    keep = np.unique(np.concatenate(([0, n - 1], changed - 1, changed)))
+    if len(keep) > n_out:
+        keep = keep[np.unique(np.linspace(0, len(keep) - 1, n_out).astype(np.int64))]
+    return keep
+
+
+def downsample_table(table: Table, fields: List[str], max_points: Optional[int]) -> Table:
+    """Reduce numeric series to about max_points rows, running LTTB per field."""
+    if not max_points or len(table) <= max_points:
+        return table
+    import numpy as np
+    x = table.epoch_ms().astype(np.float64)
+    budget = max(max_points // max(len(fields), 1), 3)
+    keep = [np.array([0, len(table) - 1])]
+    for name in fields:
+        y = np.array(table.column(name), dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(y))
+        if len(valid) == 0:
+            continue
+        keep.append(valid[lttb_indices(x[valid], y[valid], budget)])
+    return table.take(np.unique(np.concatenate(keep)))
+
+
+def downsample_state_table(table: Table, fields: List[str], max_points: Optional[int]) -> Table:
+    """Reduce boolean device series to about max_points rows without losing transitions."""
+    if not max_points or len(table) <= max_points:
+        return table
+    import numpy as np
+    states = np.array([[bool(value) for value in table.column(name)] for name in fields], dtype=bool).T
+    return table.take(change_point_indices(states, max_points))
@@ -0,0 +1,112 @@
+"""Fan-out broadcaster that pushes collector deltas to Server-Sent Events clients."""
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Optional, Set
+
+EVENT_QUEUE_SIZE = int(os.environ.get("EVENT_QUEUE_SIZE", "32"))
+EVENT_MAX_CLIENTS = int(os.environ.get("EVENT_MAX_CLIENTS", "2000"))
+EVENT_HEARTBEAT_SECONDS = float(os.environ.get("EVENT_HEARTBEAT_SECONDS", "15"))
+EVENT_RETRY_MS = int(os.environ.get("EVENT_RETRY_MS", "5000"))
+
+
+class TooManyClients(Exception):
+    pass
+
+
+@dataclass(eq=False)
+class Subscriber:
+    queue: asyncio.Queue
+    dropped: bool = False
+    connected_at: datetime = field(default_factory=datetime.utcnow)
+
+
+def format_event(event_id: int, event: str, data: dict) -> str:
+    payload = json.dumps(data, separators=(",", ":"), default=str)
+    return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class Broadcaster:
+    def __init__(self, queue_size: int = EVENT_QUEUE_SIZE, max_clients: int = EVENT_MAX_CLIENTS):
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self.clients: Set[Subscriber] = set()
+        self.dropped = 0
+        self._next_id = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+
+    def publish(self, event: str, data: dict):
+        """Queue an event for every client; safe to call from worker threads."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fanout(event, data)
+        else:
+            loop.call_soon_threadsafe(self._fanout, event, data)
+
+    def _fanout(self, event: str, data: dict):
+        self._next_id += 1
+        message = format_event(self._next_id, event, data)
+        for subscriber in list(self.clients):
+            try:
+                subscriber.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # A client that cannot keep up is disconnected rather than
+                # allowed to grow its backlog; EventSource will reconnect.
+                self._drop(subscriber)
+
+    def _drop(self, subscriber: Subscriber):
+        subscriber.dropped = True
+        self.clients.discard(subscriber)
+        self.dropped += 1
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def subscribe(self) -> Subscriber:
+        if len(self.clients) >= self.max_clients:
+            raise TooManyClients()
+        subscriber = Subscriber(queue=asyncio.Queue(maxsize=self.queue_size))
+        self.clients.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.clients.discard(subscriber)
+
+    async def stream(self, subscriber: Subscriber, hello: dict) -> AsyncIterator[str]:
+        try:
+            yield f"retry: {EVENT_RETRY_MS}\n\n"
+            yield format_event(self._next_id, "hello", hello)
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), timeout=EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if message is None:
+                    break
+                yield message
+        finally:
+            self.unsubscribe(subscriber)
+
+    def close(self):
+        for subscriber in list(self.clients):
+            self._drop(subscriber)
+        self._loop = None
+
+    def close_threadsafe(self):
+        """close() from a signal handler or another thread; the server waits for open streams before shutting down."""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self.close)
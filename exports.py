@@ -0,0 +1,115 @@
+"""Streaming NDJSON/CSV exports over server-side cursors."""
+
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import LikeEvent, SensorReading, DeviceTransition, CoinMetric
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_DATASETS = {
+    "likes": (LikeEvent, ["id", "timestamp", "source", "message"]),
+    "sensors": (SensorReading, [
+        "id", "timestamp", "air_temp", "humidity", "vpd", "soil_moisture", "co2", "leaf_temp_delta"
+    ]),
+    "devices": (DeviceTransition, ["id", "timestamp", "device", "state", "ended_at"]),
+    "coin": (CoinMetric, [
+        "id", "timestamp", "market_cap", "usd_market_cap", "holders", "replies", "ath_market_cap", "price", "volume_24h"
+    ]),
+}
+EXPORT_PATTERN = f"^({'|'.join(EXPORT_DATASETS)})$"
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def iter_rows(model, columns: List[str], start: Optional[datetime] = None,
+              end: Optional[datetime] = None, session_factory=SessionLocal) -> Iterator[dict]:
+    # The generator owns its session: a StreamingResponse keeps pulling rows
+    # after the request's dependencies have been torn down.
+    db = session_factory()
+    try:
+        stmt = select(*[getattr(model, c) for c in columns]).order_by(model.timestamp, model.id)
+        if start is not None:
+            stmt = stmt.where(model.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(model.timestamp < end)
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for row in result:
+            record = dict(zip(columns, row))
+            for name, value in record.items():
+                if isinstance(value, datetime):
+                    record[name] = value.isoformat()
+            yield record
+    finally:
+        db.close()
+
+
+def chunked(pieces: Iterator[str], size: int = EXPORT_CHUNK_BYTES) -> Iterator[bytes]:
+    buffer = []
+    buffered = 0
+    for piece in pieces:
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= size:
+            yield "".join(buffer).encode()
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def gzipped(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def ndjson_lines(records: Iterator[dict]) -> Iterator[str]:
+    for record in records:
+        yield json.dumps(record, separators=(",", ":")) + "\n"
+
+
+def csv_lines(records: Iterator[dict], columns: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_stream(dataset: str, format: str, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None, compress: bool = False) -> Iterator[bytes]:
+    model, columns = EXPORT_DATASETS[dataset]
+    records = iter_rows(model, columns, start, end)
+    lines = csv_lines(records, columns) if format == "csv" else ndjson_lines(records)
+    chunks = chunked(lines)
+    return gzipped(chunks) if compress else chunks
+
+
+def likes_document(start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[bytes]:
+    """Stream the legacy {"likes": [...], "total": n, "exported_at": ...} document."""
+    model, columns = EXPORT_DATASETS["likes"]
+
+    def pieces():
+        total = 0
+        yield '{"likes":['
+        for record in iter_rows(model, columns, start, end):
+            yield ("," if total else "") + json.dumps(record, separators=(",", ":"))
+            total += 1
+        yield f'],"total":{total},"exported_at":"{datetime.utcnow().isoformat()}"}}'
+
+    return chunked(pieces())
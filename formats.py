@@ -0,0 +1,153 @@
+"""Tabular query results and content negotiation for time-series responses."""
+
+import io
+import json
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, Request
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+_pyarrow = None
+
+
+def load_pyarrow():
+    """pyarrow (and the numpy it drags in) is only imported once an Arrow response is asked for."""
+    global _pyarrow
+    if _pyarrow is None:
+        try:
+            import pyarrow
+            import pyarrow.ipc
+        except ImportError:
+            return None
+        _pyarrow = pyarrow
+    return _pyarrow
+
+if TYPE_CHECKING:
+    import numpy as np
+
+JSON_MEDIA_TYPE = "application/json"
+COLUMNAR_MEDIA_TYPE = "application/vnd.sol.columnar+json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+ACCEPT_FORMATS = {
+    COLUMNAR_MEDIA_TYPE: "columnar",
+    MSGPACK_MEDIA_TYPE: "msgpack",
+    "application/x-msgpack": "msgpack",
+    ARROW_MEDIA_TYPE: "arrow",
+    JSON_MEDIA_TYPE: "json",
+}
+FORMAT_CHOICES = ["json", "columnar", "msgpack", "arrow"]
+FORMAT_PATTERN = f"^({'|'.join(FORMAT_CHOICES)})$"
+EPOCH = datetime(1970, 1, 1)
+
+
+class Table:
+    def __init__(self, columns: Sequence[str], rows: Sequence[Sequence], time_column: str = "timestamp"):
+        self.columns = list(columns)
+        self.rows = rows
+        self.time_column = time_column
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def column(self, name: str) -> list:
+        index = self.columns.index(name)
+        return [row[index] for row in self.rows]
+
+    def epoch_ms(self) -> "np.ndarray":
+        import numpy as np
+        return np.array(self.column(self.time_column), dtype="datetime64[ms]").astype(np.int64)
+
+    def take(self, indices) -> "Table":
+        return Table(self.columns, [self.rows[i] for i in indices], self.time_column)
+
+    def to_records(self) -> List[dict]:
+        time_index = self.columns.index(self.time_column)
+        records = []
+        for row in self.rows:
+            record = dict(zip(self.columns, row))
+            record[self.time_column] = row[time_index].isoformat()
+            records.append(record)
+        return records
+
+    def to_columns(self) -> Dict[str, list]:
+        columns = {}
+        for name in self.columns:
+            if name == self.time_column:
+                continue
+            values = self.column(name)
+            # Other datetime columns (an interval's ended_at) use the same epoch ms as the time column.
+            if any(isinstance(value, datetime) for value in values):
+                values = [None if value is None else (value - EPOCH) // timedelta(milliseconds=1) for value in values]
+            columns[name] = values
+        return {self.time_column: self.epoch_ms().tolist(), **columns}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if type(value).__module__ == "numpy":
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload, default=_json_default)
+    return json.dumps(payload, default=_json_default, separators=(",", ":")).encode()
+
+
+def negotiate(request: Request, format: Optional[str]) -> str:
+    if format:
+        return format
+    accept = request.headers.get("accept", "")
+    for part in accept.split(","):
+        media_type = part.split(";")[0].strip().lower()
+        if media_type in ACCEPT_FORMATS:
+            return ACCEPT_FORMATS[media_type]
+    return "json"
+
+
+def columnar_payload(table: Table) -> dict:
+    return {"count": len(table), "time_unit": "ms", "columns": table.to_columns()}
+
+
+def render_table(table: Table, format: str) -> Response:
+    headers = {"Vary": "Accept"}
+    if format == "columnar":
+        return Response(dumps(columnar_payload(table)), media_type=JSON_MEDIA_TYPE, headers=headers)
+    if format == "msgpack":
+        if msgpack is None:
+            raise HTTPException(status_code=406, detail="MessagePack support is not installed")
+        return Response(msgpack.packb(columnar_payload(table)), media_type=MSGPACK_MEDIA_TYPE, headers=headers)
+    if format == "arrow":
+        pyarrow = load_pyarrow()
+        if pyarrow is None:
+            raise HTTPException(status_code=406, detail="Arrow support is not installed")
+        arrays = {table.time_column: pyarrow.array(table.epoch_ms(), type=pyarrow.timestamp("ms"))}
+        for name in table.columns:
+            if name != table.time_column:
+                arrays[name] = pyarrow.array(table.column(name))
+        arrow_table = pyarrow.table(arrays)
+        sink = io.BytesIO()
+        with pyarrow.ipc.new_stream(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+        return Response(sink.getvalue(), media_type=ARROW_MEDIA_TYPE, headers=headers)
+    if orjson is not None:
+        # orjson writes naive datetimes in the same form as isoformat().
+        records = [dict(zip(table.columns, row)) for row in table.rows]
+    else:
+        records = table.to_records()
+    return Response(dumps(records), media_type=JSON_MEDIA_TYPE, headers=headers)
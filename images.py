@@ -0,0 +1,94 @@
+"""Perceptual hashes and resized JPEG/WebP renditions of webcam frames; everything here needs Pillow."""
+
+import io
+import os
+from typing import List, Optional, Tuple
+
+# Longest edge, in pixels, of each stored rendition.
+FRAME_RENDITIONS = {
+    "thumb": int(os.environ.get("WEBCAM_THUMB_SIZE", "320")),
+    "medium": int(os.environ.get("WEBCAM_MEDIUM_SIZE", "1280")),
+}
+JPEG_QUALITY = int(os.environ.get("WEBCAM_JPEG_QUALITY", "80"))
+WEBP_QUALITY = int(os.environ.get("WEBCAM_WEBP_QUALITY", "75"))
+RENDITION_FORMATS = [("jpg", "JPEG", "image/jpeg"), ("webp", "WEBP", "image/webp")]
+
+_pil = None
+
+
+def load_pillow():
+    """Pillow is optional; without it frames are stored as fetched and only exact repeats are dropped."""
+    global _pil
+    if _pil is None:
+        try:
+            import PIL.Image
+        except ImportError:
+            return None
+        _pil = PIL.Image
+    return _pil
+
+
+def perceptual_hash(content: bytes) -> Optional[str]:
+    """64-bit difference hash as 16 hex digits: one bit per horizontally adjacent pair on a 9x8 grayscale thumbnail."""
+    Image = load_pillow()
+    if Image is None:
+        return None
+    with Image.open(io.BytesIO(content)) as image:
+        # Let the JPEG decoder downscale while decoding; the hash only needs a few pixels.
+        image.draft("L", (64, 64))
+        pixels = list(image.convert("L").resize((9, 8), Image.Resampling.BILINEAR).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            bits = (bits << 1) | (left > pixels[row * 9 + col + 1])
+    return f"{bits:016x}"
+
+
+def hash_distance(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def renditions(content: bytes) -> List[Tuple[str, str, bytes]]:
+    """(name, content_type, bytes) for every size smaller than the frame, in each format Pillow can write.
+
+    Names look like "thumb.webp"; a missing encoder just means fewer renditions.
+    """
+    Image = load_pillow()
+    if Image is None:
+        return []
+    results = []
+    with Image.open(io.BytesIO(content)) as original:
+        original = original.convert("RGB")
+        for size_name, edge in sorted(FRAME_RENDITIONS.items(), key=lambda item: -item[1]):
+            if max(original.size) <= edge:
+                continue
+            image = original.copy()
+            image.thumbnail((edge, edge), Image.Resampling.LANCZOS, reducing_gap=2.0)
+            for extension, pil_format, content_type in RENDITION_FORMATS:
+                buffer = io.BytesIO()
+                try:
+                    if pil_format == "JPEG":
+                        image.save(buffer, pil_format, quality=JPEG_QUALITY, optimize=True, progressive=True)
+                    else:
+                        image.save(buffer, pil_format, quality=WEBP_QUALITY, method=4)
+                except (KeyError, OSError) as e:
+                    print(f"Cannot encode {size_name} webcam rendition as {pil_format}: {e}")
+                    continue
+                results.append((f"{size_name}.{extension}", content_type, buffer.getvalue()))
+    return results
+
+
+def jpeg_rendition(content: bytes, size_name: str) -> Optional[bytes]:
+    """One JPEG rendition, for frames stored without them; None without Pillow."""
+    Image = load_pillow()
+    if Image is None:
+        return None
+    edge = FRAME_RENDITIONS[size_name]
+    with Image.open(io.BytesIO(content)) as original:
+        original.draft("RGB", (edge, edge))
+        image = original.convert("RGB")
+    image.thumbnail((edge, edge), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
@@ -0,0 +1,187 @@
+"""Asyncio ingestion pipeline: one pooled HTTP client shared by every collector."""
+
+import asyncio
+import hashlib
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+INGEST_MAX_CONNECTIONS = int(os.environ.get("INGEST_MAX_CONNECTIONS", "10"))
+INGEST_MAX_KEEPALIVE = int(os.environ.get("INGEST_MAX_KEEPALIVE", "5"))
+INGEST_KEEPALIVE_EXPIRY = float(os.environ.get("INGEST_KEEPALIVE_EXPIRY", "120"))
+INGEST_CONCURRENCY = int(os.environ.get("INGEST_CONCURRENCY", "4"))
+
+DEFAULT_HEADERS = {"User-Agent": "SolDashboard/1.0"}
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+@dataclass
+class Source:
+    name: str
+    url: str
+    timeout: float = 15.0
+    connect_timeout: float = 5.0
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def httpx_timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+
+@dataclass
+class Validators:
+    """What we know about the last content stored for a source (or any other key)."""
+    content_hash: Optional[str] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+@dataclass
+class Job:
+    id: str
+    func: Callable[[], Awaitable[None]]
+    seconds: float
+    run_immediately: bool = False
+    last_started: Optional[float] = None
+    last_finished: Optional[float] = None
+    next_run: Optional[float] = None
+    runs: int = 0
+    failures: int = 0
+
+
+class IngestionPipeline:
+    def __init__(
+        self,
+        max_connections: int = INGEST_MAX_CONNECTIONS,
+        max_keepalive: int = INGEST_MAX_KEEPALIVE,
+        concurrency: int = INGEST_CONCURRENCY,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=INGEST_KEEPALIVE_EXPIRY,
+        )
+        self.concurrency = concurrency
+        self.client: Optional[httpx.AsyncClient] = None
+        self.jobs: Dict[str, Job] = {}
+        self.validators: Dict[str, Validators] = {}
+        self.unchanged: Dict[str, int] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def add_job(self, func: Callable[[], Awaitable[None]], seconds: float, id: str,
+                run_immediately: bool = False) -> Job:
+        job = Job(id=id, func=func, seconds=seconds, run_immediately=run_immediately)
+        self.jobs[id] = job
+        return job
+
+    async def fetch(self, source: Source, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        if self.client is None or self._semaphore is None:
+            raise RuntimeError("Ingestion pipeline is not running")
+        request_headers = {**source.headers, **(headers or {})}
+        async with self._semaphore:
+            return await self.client.get(source.url, headers=request_headers, timeout=source.httpx_timeout())
+
+    async def fetch_changed(self, source: Source) -> Optional[httpx.Response]:
+        """Conditional GET; None when upstream answers 304 or sends the body we last stored."""
+        seen = self.validators.get(source.name)
+        headers = {}
+        if seen is not None:
+            if seen.etag:
+                headers["If-None-Match"] = seen.etag
+            if seen.last_modified:
+                headers["If-Modified-Since"] = seen.last_modified
+        response = await self.fetch(source, headers)
+        if response.status_code == 304 or (
+            response.status_code == 200 and seen is not None and seen.content_hash == content_hash(response.content)
+        ):
+            self.unchanged[source.name] = self.unchanged.get(source.name, 0) + 1
+            return None
+        return response
+
+    def is_new(self, key: str, digest: str) -> bool:
+        seen = self.validators.get(key)
+        return seen is None or seen.content_hash != digest
+
+    def remember(self, key: str, digest: str, response: Optional[httpx.Response] = None):
+        """Record content as stored. Call it only after the write is queued, so a failed write is retried."""
+        validators = Validators(content_hash=digest)
+        if response is not None:
+            validators.etag = response.headers.get("etag")
+            validators.last_modified = response.headers.get("last-modified")
+        self.validators[key] = validators
+
+    async def _run_job(self, job: Job):
+        job.last_started = time.monotonic()
+        try:
+            await job.func()
+        except Exception as e:
+            job.failures += 1
+            print(f"Error in ingestion job {job.id}: {e}")
+        finally:
+            job.runs += 1
+            job.last_finished = time.monotonic()
+
+    async def _job_loop(self, job: Job):
+        # A job never overlaps itself: the next run is scheduled only after the
+        # current one finishes, so a slow upstream delays polls instead of piling them up.
+        if not job.run_immediately:
+            await self._sleep_until_next_run(job, job.seconds)
+        while True:
+            started = time.monotonic()
+            await self._run_job(job)
+            elapsed = time.monotonic() - started
+            await self._sleep_until_next_run(job, max(job.seconds - elapsed, 0))
+
+    async def _sleep_until_next_run(self, job: Job, delay: float):
+        job.next_run = time.monotonic() + delay
+        await asyncio.sleep(delay)
+
+    def seconds_until_next_run(self, *ids: str) -> Optional[float]:
+        """Seconds until the soonest scheduled run of the given jobs (all jobs if none given)."""
+        jobs = [self.jobs[id] for id in ids if id in self.jobs] if ids else list(self.jobs.values())
+        upcoming = [job.next_run for job in jobs if job.next_run is not None]
+        if not upcoming:
+            return None
+        return max(min(upcoming) - time.monotonic(), 0)
+
+    async def run_once(self, id: str):
+        await self._run_job(self.jobs[id])
+
+    async def start(self, run_jobs: bool = True):
+        if self.client is not None:
+            return
+        self.client = httpx.AsyncClient(limits=self.limits, headers=DEFAULT_HEADERS)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        if run_jobs:
+            self.start_jobs()
+
+    def start_jobs(self):
+        if self._tasks:
+            return
+        for job in self.jobs.values():
+            self._tasks.append(asyncio.create_task(self._job_loop(job), name=f"ingest:{job.id}"))
+        print(f"[{datetime.now()}] Ingestion pipeline started with {len(self.jobs)} jobs")
+
+    async def stop_jobs(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self.jobs.values():
+            job.next_run = None
+        # Whoever leads next may have stored newer content than we saw.
+        self.validators.clear()
+
+    async def shutdown(self):
+        await self.stop_jobs()
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+        self._semaphore = None
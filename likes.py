@@ -0,0 +1,151 @@
+"""Like ingestion: O(1) in-memory totals, batched event inserts and per-client rate limits."""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database import SessionLocal
+from models import Counter, LikeEvent
+
+LIKE_COUNTER_NAME = "like_events"
+LIKE_RATE_PER_MINUTE = float(os.environ.get("LIKE_RATE_PER_MINUTE", "30"))
+LIKE_BURST = float(os.environ.get("LIKE_BURST", "10"))
+LIKE_RATE_MAX_CLIENTS = int(os.environ.get("LIKE_RATE_MAX_CLIENTS", "10000"))
+LIKE_MESSAGE_MAX_LENGTH = 500
+
+
+class RateLimiter:
+    """Token bucket per client key, with least-recently-seen eviction."""
+
+    def __init__(self, rate_per_minute: float = LIKE_RATE_PER_MINUTE, burst: float = LIKE_BURST,
+                 max_clients: int = LIKE_RATE_MAX_CLIENTS):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                bucket = [self.burst, now]
+            tokens, updated = bucket
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = [tokens, now]
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return allowed
+
+
+def increment_counter(db, name: str, amount: int):
+    stmt = pg_insert(Counter).values(name=name, value=amount, updated_at=datetime.utcnow())
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[Counter.name],
+        set_={"value": Counter.value + amount, "updated_at": stmt.excluded.updated_at}
+    ))
+
+
+class LikeCounter:
+    def __init__(self, write_buffer, session_factory=SessionLocal):
+        self.write_buffer = write_buffer
+        self.session_factory = session_factory
+        self.persisted = 0
+        self.pending = 0
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @property
+    def total(self) -> int:
+        self.ensure_loaded()
+        return self.persisted + self.pending
+
+    def add(self, source: str = "web", message: Optional[str] = None) -> int:
+        self.ensure_loaded()
+        with self._lock:
+            self.write_buffer.add(LikeEvent, {
+                "timestamp": datetime.utcnow(),
+                "source": source,
+                "message": message[:LIKE_MESSAGE_MAX_LENGTH] if message else None
+            })
+            self.pending += 1
+            return self.persisted + self.pending
+
+    def on_flush(self, db, batch: Dict[type, List[dict]]):
+        # Runs inside the flush transaction: the durable total moves together
+        # with the LikeEvent rows it counts.
+        count = len(batch.get(LikeEvent, []))
+        if count:
+            increment_counter(db, LIKE_COUNTER_NAME, count)
+
+    def after_flush(self, batch: Dict[type, List[dict]]):
+        count = len(batch.get(LikeEvent, []))
+        if count:
+            with self._lock:
+                self.persisted += count
+                self.pending -= count
+
+    def apply_remote(self, batch: Dict[type, List[dict]]):
+        # Likes flushed by another worker were never pending here.
+        count = len(batch.get(LikeEvent, []))
+        if count:
+            with self._lock:
+                self.persisted += count
+
+    def load(self):
+        db = self.session_factory()
+        try:
+            counter = db.get(Counter, LIKE_COUNTER_NAME)
+            if counter is None:
+                persisted = self._reconcile(db)
+            else:
+                persisted = counter.value
+        finally:
+            db.close()
+        with self._lock:
+            self.persisted = persisted
+            self.loaded = True
+
+    def ensure_loaded(self):
+        # Concurrent first callers wait for one load instead of each running it.
+        if not self.loaded:
+            with self._load_lock:
+                if not self.loaded:
+                    self.load()
+
+    def _reconcile(self, db) -> int:
+        # The no-op upsert takes the counter row lock first, so the count below
+        # sees every committed flush; flushes still in flight add their own
+        # increment once we commit.
+        increment_counter(db, LIKE_COUNTER_NAME, 0)
+        exact = db.query(func.count(LikeEvent.id)).scalar()
+        db.query(Counter).filter(Counter.name == LIKE_COUNTER_NAME).update(
+            {"value": exact, "updated_at": datetime.utcnow()}
+        )
+        db.commit()
+        return exact
+
+    def reconcile(self) -> int:
+        """Reset the persisted total to an exact count of the like_events log."""
+        db = self.session_factory()
+        try:
+            exact = self._reconcile(db)
+        finally:
+            db.close()
+        with self._lock:
+            if exact != self.persisted:
+                print(f"[{datetime.now()}] Reconciled like total {self.persisted} -> {exact}")
+            self.persisted = exact
+            self.loaded = True
+        return exact
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, Float, String, Boolean, DateTime, Text, Index
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Boolean, DateTime, Text, Index, UniqueConstraint, text
 from database import Base
 
 class SensorReading(Base):
@@ -30,6 +30,20 @@ class DeviceState(Base):
     water_pump = Column(Boolean, default=False)
     humidifier = Column(Boolean, default=False)
 
+class DeviceTransition(Base):
+    __tablename__ = "device_transitions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    device = Column(String(50), nullable=False)
+    state = Column(Boolean, nullable=False)
+    ended_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index('idx_device_transition_device', 'device', 'timestamp'),
+        Index('idx_device_transition_open', 'device', postgresql_where=text('ended_at IS NULL')),
+    )
+
 class AIOutput(Base):
     __tablename__ = "ai_outputs"
     
@@ -37,6 +51,11 @@ class AIOutput(Base):
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     output_text = Column(Text)
     sol_day = Column(Integer, nullable=True)
+    output_hash = Column(String(64), nullable=True)
+    
+    __table_args__ = (
+        Index('idx_ai_outputs_output_hash', 'output_hash'),
+    )
 
 class CoinMetric(Base):
     __tablename__ = "coin_metrics"
@@ -70,6 +89,99 @@ class HourlyAggregate(Base):
     light_uptime_pct = Column(Float, nullable=True)
     heat_uptime_pct = Column(Float, nullable=True)
 
+class SensorRollup(Base):
+    __tablename__ = "sensor_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    resolution = Column(String(8), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    samples = Column(Integer, default=0)
+    air_temp_count = Column(Integer, default=0)
+    air_temp_sum = Column(Float, default=0)
+    air_temp_min = Column(Float, nullable=True)
+    air_temp_max = Column(Float, nullable=True)
+    humidity_count = Column(Integer, default=0)
+    humidity_sum = Column(Float, default=0)
+    humidity_min = Column(Float, nullable=True)
+    humidity_max = Column(Float, nullable=True)
+    vpd_count = Column(Integer, default=0)
+    vpd_sum = Column(Float, default=0)
+    vpd_min = Column(Float, nullable=True)
+    vpd_max = Column(Float, nullable=True)
+    soil_moisture_count = Column(Integer, default=0)
+    soil_moisture_sum = Column(Float, default=0)
+    soil_moisture_min = Column(Float, nullable=True)
+    soil_moisture_max = Column(Float, nullable=True)
+    co2_count = Column(Integer, default=0)
+    co2_sum = Column(Float, default=0)
+    co2_min = Column(Float, nullable=True)
+    co2_max = Column(Float, nullable=True)
+    leaf_temp_delta_count = Column(Integer, default=0)
+    leaf_temp_delta_sum = Column(Float, default=0)
+    leaf_temp_delta_min = Column(Float, nullable=True)
+    leaf_temp_delta_max = Column(Float, nullable=True)
+    
+    __table_args__ = (
+        UniqueConstraint('resolution', 'bucket_start', name='uq_sensor_rollup_bucket'),
+    )
+
+class CoinRollup(Base):
+    __tablename__ = "coin_rollups"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    resolution = Column(String(8), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    samples = Column(Integer, default=0)
+    market_cap_count = Column(Integer, default=0)
+    market_cap_sum = Column(Float, default=0)
+    market_cap_min = Column(Float, nullable=True)
+    market_cap_max = Column(Float, nullable=True)
+    usd_market_cap_count = Column(Integer, default=0)
+    usd_market_cap_sum = Column(Float, default=0)
+    usd_market_cap_min = Column(Float, nullable=True)
+    usd_market_cap_max = Column(Float, nullable=True)
+    holders_count = Column(Integer, default=0)
+    holders_sum = Column(Float, default=0)
+    holders_min = Column(Float, nullable=True)
+    holders_max = Column(Float, nullable=True)
+    replies_count = Column(Integer, default=0)
+    replies_sum = Column(Float, default=0)
+    replies_min = Column(Float, nullable=True)
+    replies_max = Column(Float, nullable=True)
+    price_count = Column(Integer, default=0)
+    price_sum = Column(Float, default=0)
+    price_min = Column(Float, nullable=True)
+    price_max = Column(Float, nullable=True)
+    
+    __table_args__ = (
+        UniqueConstraint('resolution', 'bucket_start', name='uq_coin_rollup_bucket'),
+    )
+
+class WebcamFrame(Base):
+    __tablename__ = "webcam_frames"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    path = Column(String(500), unique=True, nullable=False)
+    size = Column(Integer, nullable=True)
+    content_type = Column(String(100), nullable=True)
+    content_hash = Column(String(64), nullable=True)
+    perceptual_hash = Column(String(16), nullable=True)
+    renditions = Column(String(200), nullable=True)
+
+class TimelapseFrame(Base):
+    __tablename__ = "timelapse_frames"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    timelapse = Column(String(40), nullable=False)
+    timestamp = Column(DateTime, nullable=False)
+    offset = Column(BigInteger, nullable=False)
+    length = Column(Integer, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_timelapse_frame', 'timelapse', 'timestamp', unique=True),
+    )
+
 class LikeEvent(Base):
     __tablename__ = "like_events"
     
@@ -77,3 +189,20 @@ class LikeEvent(Base):
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
     source = Column(String(100), nullable=True)
     message = Column(Text, nullable=True)
+
+class Counter(Base):
+    __tablename__ = "counters"
+    
+    name = Column(String(100), primary_key=True)
+    value = Column(BigInteger, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class TableStat(Base):
+    __tablename__ = "table_stats"
+    
+    table_name = Column(String(100), primary_key=True)
+    row_count = Column(BigInteger, default=0, nullable=False)
+    oldest = Column(DateTime, nullable=True)
+    newest = Column(DateTime, nullable=True)
+    reconciled_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
@@ -1,37 +1,73 @@
 import os
 import json
+import mimetypes
+import threading
+import uuid
 import httpx
-from typing import Optional, List
-from google.cloud import storage
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Optional, List
+
+if TYPE_CHECKING:
+    from google.cloud import storage
 
 REPLIT_SIDECAR_ENDPOINT = "http://127.0.0.1:1106"
+SIGNED_URL_ENDPOINT = f"{REPLIT_SIDECAR_ENDPOINT}/object-storage/signed-object-url"
 
-def get_storage_client() -> storage.Client:
-    credentials_config = {
-        "audience": "replit",
-        "subject_token_type": "access_token",
-        "token_url": f"{REPLIT_SIDECAR_ENDPOINT}/token",
-        "type": "external_account",
-        "credential_source": {
-            "url": f"{REPLIT_SIDECAR_ENDPOINT}/credential",
-            "format": {
-                "type": "json",
-                "subject_token_field_name": "access_token"
-            }
-        },
-        "universe_domain": "googleapis.com"
-    }
-    
-    from google.oauth2 import credentials as oauth2_credentials
-    from google.auth import external_account
-    
-    creds = external_account.Credentials.from_info(credentials_config)
-    return storage.Client(credentials=creds, project="")
+OBJECT_STORAGE_BACKEND = os.environ.get("OBJECT_STORAGE_BACKEND", "gcs")
+LOCAL_STORAGE_DIR = os.environ.get("LOCAL_STORAGE_DIR", "local_storage")
+LOCAL_STORAGE_URL_PREFIX = "/local-storage"
+STORAGE_POOL_SIZE = int(os.environ.get("STORAGE_POOL_SIZE", "32"))
+# GCS refuses to compose an object built from more than 1024 components.
+COMPOSE_COMPONENT_LIMIT = 1024
+
+CREDENTIALS_CONFIG = {
+    "audience": "replit",
+    "subject_token_type": "access_token",
+    "token_url": f"{REPLIT_SIDECAR_ENDPOINT}/token",
+    "type": "external_account",
+    "credential_source": {
+        "url": f"{REPLIT_SIDECAR_ENDPOINT}/credential",
+        "format": {
+            "type": "json",
+            "subject_token_field_name": "access_token"
+        }
+    },
+    "universe_domain": "googleapis.com"
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_storage_client() -> "storage.Client":
+    # One client per process, shared by request handlers and collector
+    # threads: the credentials keep their access token until it expires and
+    # every call reuses the session's connection pool.
+    global _client
+    if _client is not None:
+        return _client
+    with _client_lock:
+        if _client is None:
+            # google-cloud-storage pulls in most of google-auth; import it on
+            # first use rather than on every server start.
+            import requests
+            from google.auth import external_account
+            from google.auth.transport.requests import AuthorizedSession
+            from google.cloud import storage
+
+            creds = external_account.Credentials.from_info(CREDENTIALS_CONFIG)
+            session = AuthorizedSession(creds)
+            adapter = requests.adapters.HTTPAdapter(pool_connections=STORAGE_POOL_SIZE, pool_maxsize=STORAGE_POOL_SIZE)
+            session.mount("https://", adapter)
+            _client = storage.Client(credentials=creds, project="", _http=session)
+    return _client
 
 def get_public_object_search_paths() -> List[str]:
     paths_str = os.environ.get("PUBLIC_OBJECT_SEARCH_PATHS", "")
     paths = [p.strip() for p in paths_str.split(",") if p.strip()]
     if not paths:
+        if isinstance(_backend, LocalBackend):
+            return ["/local/public"]
         raise ValueError("PUBLIC_OBJECT_SEARCH_PATHS not set")
     return paths
 
@@ -57,71 +93,174 @@ def parse_object_path(path: str) -> tuple:
     object_name = "/".join(parts[2:])
     return bucket_name, object_name
 
-def save_file(content: bytes, object_path: str, content_type: str = "image/jpeg") -> str:
-    client = get_storage_client()
-    
+class GCSBackend:
+    signs_urls = True
+
+    def save(self, bucket_name: str, object_name: str, content: bytes, content_type: str):
+        blob = get_storage_client().bucket(bucket_name).blob(object_name)
+        blob.upload_from_string(content, content_type=content_type)
+
+    def read(self, bucket_name: str, object_name: str) -> bytes:
+        from google.api_core.exceptions import NotFound
+        try:
+            return get_storage_client().bucket(bucket_name).blob(object_name).download_as_bytes()
+        except NotFound:
+            raise FileNotFoundError(f"/{bucket_name}/{object_name}")
+
+    def append(self, bucket_name: str, object_name: str, content: bytes, content_type: str) -> int:
+        """Append by composing the object with an uploaded piece; returns the new size."""
+        bucket = get_storage_client().bucket(bucket_name)
+        target = bucket.get_blob(object_name)
+        if target is None:
+            self.save(bucket_name, object_name, content, content_type)
+            return len(content)
+        if (target.component_count or 1) >= COMPOSE_COMPONENT_LIMIT - 1:
+            # Rewriting the object as one upload resets its component count.
+            data = target.download_as_bytes() + content
+            target.upload_from_string(data, content_type=content_type)
+            return len(data)
+        piece = bucket.blob(f"{object_name}.append-{uuid.uuid4().hex}")
+        piece.upload_from_string(content, content_type=content_type)
+        try:
+            target.content_type = content_type
+            target.compose([target, piece], if_generation_match=target.generation)
+        finally:
+            piece.delete()
+        return target.size
+
+    def iter(self, bucket_name: str, object_prefix: str) -> Iterator[dict]:
+        bucket = get_storage_client().bucket(bucket_name)
+        for blob in bucket.list_blobs(prefix=object_prefix):
+            yield {
+                "name": blob.name,
+                "path": f"/{bucket_name}/{blob.name}",
+                "size": blob.size,
+                "updated": blob.updated.isoformat() if blob.updated else None,
+                "content_type": blob.content_type
+            }
+
+    def public_url(self, bucket_name: str, object_name: str) -> str:
+        return f"https://storage.googleapis.com/{bucket_name}/{object_name}"
+
+class LocalBackend:
+    """Stores objects under a directory, laid out as <root>/<bucket>/<object>; for development and benchmarks."""
+    signs_urls = False
+
+    def __init__(self, root: str = LOCAL_STORAGE_DIR):
+        self.root = Path(root)
+
+    def save(self, bucket_name: str, object_name: str, content: bytes, content_type: str):
+        target = self.root / bucket_name / object_name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        partial = target.with_name(f".{target.name}.{threading.get_ident()}.tmp")
+        partial.write_bytes(content)
+        os.replace(partial, target)
+
+    def read(self, bucket_name: str, object_name: str) -> bytes:
+        return (self.root / bucket_name / object_name).read_bytes()
+
+    def append(self, bucket_name: str, object_name: str, content: bytes, content_type: str) -> int:
+        target = self.root / bucket_name / object_name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "ab") as f:
+            f.write(content)
+            return f.tell()
+
+    def iter(self, bucket_name: str, object_prefix: str) -> Iterator[dict]:
+        bucket_root = self.root / bucket_name
+        # Walk only the directory the prefix points into, like a GCS prefix listing.
+        start = bucket_root / object_prefix.rsplit("/", 1)[0] if "/" in object_prefix else bucket_root
+        for directory, _, filenames in os.walk(start):
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+                file_path = Path(directory) / filename
+                name = file_path.relative_to(bucket_root).as_posix()
+                if not name.startswith(object_prefix):
+                    continue
+                stat = file_path.stat()
+                yield {
+                    "name": name,
+                    "path": f"/{bucket_name}/{name}",
+                    "size": stat.st_size,
+                    "updated": datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat(),
+                    "content_type": mimetypes.guess_type(name)[0]
+                }
+
+    def public_url(self, bucket_name: str, object_name: str) -> str:
+        return f"{LOCAL_STORAGE_URL_PREFIX}/{bucket_name}/{object_name}"
+
+_backend = LocalBackend() if OBJECT_STORAGE_BACKEND == "local" else GCSBackend()
+
+def get_backend():
+    return _backend
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+
+def full_object_path(object_path: str) -> str:
     public_paths = get_public_object_search_paths()
     if not public_paths:
         raise ValueError("No public object search paths configured")
     
-    base_path = public_paths[0]
-    full_path = f"{base_path}/{object_path}"
+    return f"{public_paths[0]}/{object_path}"
+
+def save_file(content: bytes, object_path: str, content_type: str = "image/jpeg") -> str:
+    full_path = full_object_path(object_path)
     
     bucket_name, object_name = parse_object_path(full_path)
     
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(object_name)
-    
-    blob.upload_from_string(content, content_type=content_type)
+    _backend.save(bucket_name, object_name, content, content_type)
     
     return full_path
 
-def list_files(prefix: str) -> List[dict]:
-    client = get_storage_client()
+def read_file(path: str) -> bytes:
+    """Contents of a stored object by its full path; FileNotFoundError when it is gone."""
+    bucket_name, object_name = parse_object_path(path)
+    return _backend.read(bucket_name, object_name)
+
+def append_file(content: bytes, object_path: str, content_type: str = "application/octet-stream") -> tuple:
+    """Append to (or create) an object; returns its full path and its size after the append."""
+    full_path = full_object_path(object_path)
     
+    bucket_name, object_name = parse_object_path(full_path)
+    
+    size = _backend.append(bucket_name, object_name, content, content_type)
+    
+    return full_path, size
+
+def iter_files(prefix: str) -> Iterator[dict]:
     public_paths = get_public_object_search_paths()
     if not public_paths:
-        return []
+        return
     
     base_path = public_paths[0]
     full_prefix = f"{base_path}/{prefix}"
     
     bucket_name, object_prefix = parse_object_path(full_prefix)
     
-    bucket = client.bucket(bucket_name)
-    blobs = bucket.list_blobs(prefix=object_prefix)
-    
-    files = []
-    for blob in blobs:
-        files.append({
-            "name": blob.name,
-            "path": f"/{bucket_name}/{blob.name}",
-            "size": blob.size,
-            "updated": blob.updated.isoformat() if blob.updated else None,
-            "content_type": blob.content_type
-        })
-    
-    return sorted(files, key=lambda x: x["updated"] or "", reverse=True)
+    yield from _backend.iter(bucket_name, object_prefix)
 
-def get_signed_url(object_path: str, ttl_sec: int = 3600) -> str:
+def list_files(prefix: str) -> List[dict]:
+    return sorted(iter_files(prefix), key=lambda x: x["updated"] or "", reverse=True)
+
+def signed_url_request(object_path: str, expires_at: datetime) -> dict:
     bucket_name, object_name = parse_object_path(object_path)
-    
-    request_body = {
+    return {
         "bucket_name": bucket_name,
         "object_name": object_name,
         "method": "GET",
-        "expires_at": None
+        "expires_at": expires_at.isoformat() + "Z"
     }
+
+def get_signed_url(object_path: str, ttl_sec: int = 3600) -> str:
+    if not _backend.signs_urls:
+        return get_public_url(object_path)
     
-    from datetime import datetime, timedelta
-    expires_at = datetime.utcnow() + timedelta(seconds=ttl_sec)
-    request_body["expires_at"] = expires_at.isoformat() + "Z"
+    request_body = signed_url_request(object_path, datetime.utcnow() + timedelta(seconds=ttl_sec))
     
-    response = httpx.post(
-        f"{REPLIT_SIDECAR_ENDPOINT}/object-storage/signed-object-url",
-        json=request_body,
-        timeout=15
-    )
+    response = httpx.post(SIGNED_URL_ENDPOINT, json=request_body, timeout=15)
     
     if not response.is_success:
         raise Exception(f"Failed to sign URL: {response.status_code}")
@@ -130,4 +269,4 @@ def get_signed_url(object_path: str, ttl_sec: int = 3600) -> str:
 
 def get_public_url(object_path: str) -> str:
     bucket_name, object_name = parse_object_path(object_path)
-    return f"https://storage.googleapis.com/{bucket_name}/{object_name}"
+    return _backend.public_url(bucket_name, object_name)
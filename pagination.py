@@ -0,0 +1,74 @@
+"""Keyset pagination on (timestamp, id) with opaque continuation tokens."""
+
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+
+from formats import Table
+
+Cursor = Tuple[datetime, int]
+
+
+def encode_cursor(timestamp: datetime, id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        timestamp, id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(timestamp), int(id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@dataclass
+class Page:
+    table: Table
+    first_cursor: Optional[str]
+    last_cursor: Optional[str]
+    has_more: bool
+
+    def headers(self) -> Dict[str, str]:
+        headers = {"X-Has-More": "true" if self.has_more else "false"}
+        if self.first_cursor:
+            headers["X-Prev-Cursor"] = self.first_cursor
+        if self.last_cursor:
+            headers["X-Next-Cursor"] = self.last_cursor
+        return headers
+
+
+def keyset_page(db, model, columns: List[str], since: Optional[datetime], after: Optional[str],
+                before: Optional[str], limit: int, time_column: str = "timestamp") -> Page:
+    """Fetch up to limit rows strictly after/before the given cursors, oldest first."""
+    time_attr = getattr(model, time_column)
+    key = tuple_(time_attr, model.id)
+    query = db.query(time_attr, model.id, *[getattr(model, c) for c in columns if c != time_column])
+    if since is not None:
+        query = query.filter(time_attr >= since)
+    if after:
+        query = query.filter(key > tuple_(*decode_cursor(after)))
+    if before:
+        query = query.filter(key < tuple_(*decode_cursor(before)))
+
+    if before and not after:
+        # Walking backwards: take the newest rows below the cursor, then restore
+        # ascending order for the response.
+        rows = query.order_by(time_attr.desc(), model.id.desc()).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = list(reversed(rows[:limit]))
+    else:
+        rows = query.order_by(time_attr, model.id).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+    output_columns = [time_column] + [c for c in columns if c != time_column]
+    table = Table(output_columns, [(row[0], *row[2:]) for row in rows], time_column=time_column)
+    first_cursor = encode_cursor(rows[0][0], rows[0][1]) if rows else None
+    last_cursor = encode_cursor(rows[-1][0], rows[-1][1]) if rows else None
+    return Page(table, first_cursor, last_cursor, has_more)
@@ -0,0 +1,161 @@
+"""Cached GET responses keyed on the data version, with strong ETags and 304s."""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Bodies that depend on a sliding time window (hours=24 etc.) are rebuilt at
+# least this often even if no collector has written anything.
+RESPONSE_CACHE_TTL = float(os.environ.get("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_DEFAULT_MAX_AGE = int(os.environ.get("RESPONSE_CACHE_DEFAULT_MAX_AGE", "30"))
+
+Headers = List[Tuple[bytes, bytes]]
+CacheKey = Tuple[str, bytes, bytes]
+
+
+@dataclass
+class CachedResponse:
+    version: int
+    created: float
+    status: int
+    headers: Headers
+    body: bytes
+    etag: bytes
+
+
+def make_etag(body: bytes) -> bytes:
+    return b'"' + hashlib.blake2b(body, digest_size=16).hexdigest().encode() + b'"'
+
+
+def etag_matches(if_none_match: Optional[bytes], etag: bytes) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(b",")]
+    return b"*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    def __init__(self, max_age: Callable[[], Optional[float]] = lambda: None, paths: Iterable[str] = (),
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, max_bytes: int = RESPONSE_CACHE_MAX_BYTES,
+                 ttl: float = RESPONSE_CACHE_TTL, models: Optional[Iterable[type]] = None):
+        self.version = 0
+        self.models = set(models) if models is not None else None
+        self.max_age = max_age
+        self.paths = set(paths)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def bump(self):
+        """Mark every cached body stale; called after anything that changes stored data commits."""
+        with self._lock:
+            self.version += 1
+
+    def on_flush(self, batch: Dict[type, List[dict]]):
+        if any(rows for model, rows in batch.items() if self.models is None or model in self.models):
+            self.bump()
+
+    def get(self, key: CacheKey, version: int) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version or time.monotonic() - entry.created > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: CacheKey, entry: CachedResponse):
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+            self._entries[key] = entry
+            self._bytes += len(entry.body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def cache_control(self) -> bytes:
+        seconds = self.max_age()
+        if seconds is None:
+            seconds = RESPONSE_CACHE_DEFAULT_MAX_AGE
+        return f"public, max-age={int(seconds)}".encode()
+
+
+class CacheMiddleware:
+    """ASGI middleware: repeat GETs of the configured paths are answered from the cache."""
+
+    def __init__(self, app, cache: ResponseCache):
+        self.app = app
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] not in ("GET", "HEAD")
+                or scope["path"] not in self.cache.paths):
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        key = (scope["path"], scope["query_string"], request_headers.get(b"accept", b""))
+        if_none_match = request_headers.get(b"if-none-match")
+        # Read the version before rendering: a flush that lands mid-render
+        # leaves the entry tagged stale, so the next request re-renders.
+        version = self.cache.version
+        entry = self.cache.get(key, version)
+        head = scope["method"] == "HEAD"
+        if entry is None:
+            start, body = await self._render(scope, receive)
+            if start.get("status") != 200:
+                # Errors, redirects and 304s from the endpoint itself pass through uncached.
+                await send(start)
+                await send({"type": "http.response.body", "body": b"" if head else body})
+                return
+            headers = [
+                (name, value) for name, value in start.get("headers", [])
+                if name.lower() not in (b"etag", b"cache-control")
+            ]
+            entry = CachedResponse(version, time.monotonic(), 200, headers, body, make_etag(body))
+            self.cache.put(key, entry)
+        await self._send(send, entry, if_none_match, head)
+
+    async def _render(self, scope, receive) -> Tuple[dict, bytes]:
+        start = {}
+        chunks = []
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app({**scope, "method": "GET"}, receive, capture)
+        return start, b"".join(chunks)
+
+    async def _send(self, send, entry: CachedResponse, if_none_match: Optional[bytes], head: bool):
+        cache_headers = [(b"etag", entry.etag), (b"cache-control", self.cache.cache_control())]
+        if etag_matches(if_none_match, entry.etag):
+            headers = [(name, value) for name, value in entry.headers if name.lower() == b"vary"]
+            await send({"type": "http.response.start", "status": 304, "headers": headers + cache_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        await send({"type": "http.response.start", "status": entry.status, "headers": entry.headers + cache_headers})
+        await send({"type": "http.response.body", "body": b"" if head else entry.body})
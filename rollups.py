@@ -0,0 +1,424 @@
+"""Incrementally maintained rollups: hourly aggregates and the 5m/1h/1d pyramid."""
+
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import exists, func, literal, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database import SessionLocal
+from devices import DEVICE_NAMES, bucket_durations, duty_cycle, load_intervals
+from formats import Table
+from models import (
+    SensorReading, DeviceTransition, CoinMetric, HourlyAggregate,
+    SensorRollup, CoinRollup
+)
+from write_buffer import observed_rows
+
+SENSOR_FIELDS = ["air_temp", "humidity", "vpd", "soil_moisture", "co2"]
+DEVICE_FIELDS = ["grow_light", "heat_mat"]
+
+
+@dataclass
+class FieldStats:
+    count: int = 0
+    total: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+    def add(self, value: Optional[float]):
+        if value is None:
+            return
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+
+@dataclass
+class HourAccumulator:
+    hour_start: datetime
+    sensor_samples: int = 0
+    fields: Dict[str, FieldStats] = field(default_factory=lambda: {f: FieldStats() for f in SENSOR_FIELDS})
+
+    def add_sensor(self, values: dict):
+        self.sensor_samples += 1
+        for name in SENSOR_FIELDS:
+            self.fields[name].add(values.get(name))
+
+    def to_row(self, uptime: Dict[str, Optional[float]]) -> dict:
+        return {
+            "hour_start": self.hour_start,
+            "avg_temp": self.fields["air_temp"].mean,
+            "avg_humidity": self.fields["humidity"].mean,
+            "avg_vpd": self.fields["vpd"].mean,
+            "avg_soil_moisture": self.fields["soil_moisture"].mean,
+            "avg_co2": self.fields["co2"].mean,
+            "min_temp": self.fields["air_temp"].min,
+            "max_temp": self.fields["air_temp"].max,
+            "light_uptime_pct": uptime.get("grow_light"),
+            "heat_uptime_pct": uptime.get("heat_mat"),
+        }
+
+
+def hour_floor(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def grouped_hour_stats(db, since: datetime, until: datetime, missing_only: bool = False) -> List[HourAccumulator]:
+    """Compute per-hour count/sum/min/max for every sensor field in one grouped query."""
+    sensor_hour = func.date_trunc("hour", SensorReading.timestamp).label("hour")
+    sensor_columns = [sensor_hour, func.count(SensorReading.id).label("samples")]
+    for name in SENSOR_FIELDS:
+        column = getattr(SensorReading, name)
+        sensor_columns += [
+            func.count(column).label(f"{name}_count"),
+            func.sum(column).label(f"{name}_sum"),
+            func.min(column).label(f"{name}_min"),
+            func.max(column).label(f"{name}_max"),
+        ]
+    stmt = select(*sensor_columns).where(
+        SensorReading.timestamp >= since,
+        SensorReading.timestamp < until
+    ).group_by(sensor_hour).order_by(sensor_hour)
+    if missing_only:
+        stmt = stmt.where(~exists().where(HourlyAggregate.hour_start == sensor_hour))
+
+    result = []
+    for row in db.execute(stmt).mappings():
+        acc = HourAccumulator(hour_start=row["hour"])
+        acc.sensor_samples = row["samples"]
+        for name in SENSOR_FIELDS:
+            acc.fields[name] = FieldStats(
+                count=row[f"{name}_count"],
+                total=float(row[f"{name}_sum"] or 0.0),
+                min=row[f"{name}_min"],
+                max=row[f"{name}_max"],
+            )
+        result.append(acc)
+    return result
+
+
+def hourly_uptime(db, hours: List[datetime]) -> Dict[datetime, Dict[str, Optional[float]]]:
+    """Exact uptime percentage of each device in DEVICE_FIELDS for each given hour."""
+    step = timedelta(hours=1)
+    start, end = min(hours), max(hours) + step
+    intervals = load_intervals(db, start, end, DEVICE_FIELDS)
+    wanted = set(hours)
+    return {
+        hour: {name: duty_cycle(*durations[name]) for name in durations}
+        for hour, durations in bucket_durations(intervals, start, end, step)
+        if hour in wanted
+    }
+
+
+def upsert_aggregates(db, accumulators: List[HourAccumulator]):
+    accumulators = [acc for acc in accumulators if acc.sensor_samples]
+    if not accumulators:
+        return
+    uptime = hourly_uptime(db, [acc.hour_start for acc in accumulators])
+    rows = [acc.to_row(uptime.get(acc.hour_start, {})) for acc in accumulators]
+    stmt = pg_insert(HourlyAggregate).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[HourlyAggregate.hour_start],
+        set_={name: stmt.excluded[name] for name in rows[0] if name != "hour_start"}
+    )
+    db.execute(stmt)
+
+
+class HourlyRollup:
+    def __init__(self, session_factory=SessionLocal, keep_hours: int = 2):
+        self.session_factory = session_factory
+        self.keep_hours = keep_hours
+        self._hours: Dict[datetime, HourAccumulator] = {}
+        self._lock = threading.Lock()
+
+    def _accumulator(self, ts: datetime) -> HourAccumulator:
+        hour = hour_floor(ts)
+        acc = self._hours.get(hour)
+        if acc is None:
+            acc = self._hours[hour] = HourAccumulator(hour_start=hour)
+        return acc
+
+    def _evict(self, now: datetime):
+        cutoff = hour_floor(now) - timedelta(hours=self.keep_hours - 1)
+        for hour in [h for h in self._hours if h < cutoff]:
+            del self._hours[hour]
+
+    def on_flush(self, batch: Dict[type, List[dict]]):
+        touched = set()
+        with self._lock:
+            # Aggregates cover every collected reading, including ones compression did not store.
+            for values in observed_rows(batch.get(SensorReading, [])):
+                acc = self._accumulator(values["timestamp"])
+                acc.add_sensor(values)
+                touched.add(acc.hour_start)
+            if touched or batch.get(DeviceTransition):
+                # Uptime is measured from the transition log up to now, so
+                # every open hour is rewritten; this also gives the previous
+                # hour its final figure on the first flush after it closes.
+                touched.update(self._hours)
+            dirty = [self._hours[h] for h in sorted(touched)]
+            self._evict(datetime.utcnow())
+            if not dirty:
+                return
+            db = self.session_factory()
+            try:
+                upsert_aggregates(db, dirty)
+                db.commit()
+            finally:
+                db.close()
+
+    def warm(self):
+        """Seed accumulators for the open hours from rows already stored."""
+        now = datetime.utcnow()
+        since = hour_floor(now) - timedelta(hours=self.keep_hours - 1)
+        db = self.session_factory()
+        try:
+            accumulators = grouped_hour_stats(db, since, now + timedelta(hours=1))
+            with self._lock:
+                for acc in accumulators:
+                    self._hours[acc.hour_start] = acc
+            upsert_aggregates(db, accumulators)
+            db.commit()
+        finally:
+            db.close()
+
+    def backfill(self, since: Optional[datetime] = None) -> int:
+        """Fill every closed hour that has readings but no aggregate row."""
+        until = hour_floor(datetime.utcnow()) - timedelta(hours=self.keep_hours - 1)
+        db = self.session_factory()
+        try:
+            accumulators = grouped_hour_stats(db, since or datetime.min, until, missing_only=True)
+            upsert_aggregates(db, accumulators)
+            db.commit()
+        finally:
+            db.close()
+        if accumulators:
+            print(f"[{datetime.now()}] Backfilled {len(accumulators)} hourly aggregates")
+        return len(accumulators)
+
+    def refresh_uptime(self) -> int:
+        """Recompute device uptime for every hour stored without it, e.g. before device history was imported."""
+        db = self.session_factory()
+        try:
+            rows = db.query(HourlyAggregate.id, HourlyAggregate.hour_start).filter(
+                HourlyAggregate.light_uptime_pct.is_(None) | HourlyAggregate.heat_uptime_pct.is_(None)
+            ).all()
+            if not rows:
+                return 0
+            uptime = hourly_uptime(db, [hour for _, hour in rows])
+            updates = [
+                {
+                    "id": id,
+                    "light_uptime_pct": uptime.get(hour, {}).get("grow_light"),
+                    "heat_uptime_pct": uptime.get(hour, {}).get("heat_mat"),
+                }
+                for id, hour in rows
+            ]
+            db.execute(update(HourlyAggregate), updates)
+            db.commit()
+        finally:
+            db.close()
+        print(f"[{datetime.now()}] Recomputed device uptime for {len(updates)} hourly aggregates")
+        return len(updates)
+
+
+RESOLUTIONS = {
+    "5m": timedelta(minutes=5),
+    "1h": timedelta(hours=1),
+    "1d": timedelta(days=1),
+}
+RESOLUTION_CHOICES = ["auto", "raw"] + list(RESOLUTIONS)
+BUCKET_ORIGIN = datetime(2000, 1, 1)
+
+
+@dataclass
+class RollupSpec:
+    name: str
+    source: type
+    rollup: type
+    stat_fields: List[str] = field(default_factory=list)
+
+
+SENSOR_PYRAMID = RollupSpec(
+    "sensors", SensorReading, SensorRollup,
+    stat_fields=["air_temp", "humidity", "vpd", "soil_moisture", "co2", "leaf_temp_delta"]
+)
+COIN_PYRAMID = RollupSpec(
+    "coin", CoinMetric, CoinRollup,
+    stat_fields=["market_cap", "usd_market_cap", "holders", "replies", "price"]
+)
+PYRAMIDS = [SENSOR_PYRAMID, COIN_PYRAMID]
+
+
+def bucket_floor(ts: datetime, step: timedelta) -> datetime:
+    return ts - (ts - BUCKET_ORIGIN) % step
+
+
+def select_resolution(hours: int, min_points: int) -> str:
+    """Pick the coarsest tier that still yields at least min_points buckets."""
+    window = timedelta(hours=hours)
+    for name, step in sorted(RESOLUTIONS.items(), key=lambda item: item[1], reverse=True):
+        if window / step >= min_points:
+            return name
+    return "raw"
+
+
+@dataclass
+class BucketAccumulator:
+    bucket_start: datetime
+    samples: int = 0
+    stats: Dict[str, FieldStats] = field(default_factory=dict)
+
+    def add(self, spec: RollupSpec, values: dict):
+        self.samples += 1
+        for name in spec.stat_fields:
+            self.stats.setdefault(name, FieldStats()).add(values.get(name))
+
+    def to_row(self, spec: RollupSpec, resolution: str) -> dict:
+        row = {"resolution": resolution, "bucket_start": self.bucket_start, "samples": self.samples}
+        for name in spec.stat_fields:
+            stats = self.stats.get(name, FieldStats())
+            row[f"{name}_count"] = stats.count
+            row[f"{name}_sum"] = stats.total
+            row[f"{name}_min"] = stats.min
+            row[f"{name}_max"] = stats.max
+        return row
+
+
+def upsert_rollup_deltas(db, spec: RollupSpec, rows: List[dict]):
+    """Add per-bucket deltas onto the stored buckets, creating missing ones."""
+    if not rows:
+        return
+    table = spec.rollup.__table__
+    stmt = pg_insert(spec.rollup).values(rows)
+    excluded = stmt.excluded
+    set_ = {"samples": table.c.samples + excluded.samples}
+    for name in spec.stat_fields:
+        set_[f"{name}_count"] = table.c[f"{name}_count"] + excluded[f"{name}_count"]
+        set_[f"{name}_sum"] = table.c[f"{name}_sum"] + excluded[f"{name}_sum"]
+        set_[f"{name}_min"] = func.least(table.c[f"{name}_min"], excluded[f"{name}_min"])
+        set_[f"{name}_max"] = func.greatest(table.c[f"{name}_max"], excluded[f"{name}_max"])
+    db.execute(stmt.on_conflict_do_update(index_elements=["resolution", "bucket_start"], set_=set_))
+
+
+def backfill_rollup(db, spec: RollupSpec, resolution: str):
+    """Fill missing buckets of one tier from raw rows with one grouped INSERT ... SELECT."""
+    step = RESOLUTIONS[resolution]
+    source = spec.source
+    rollup = spec.rollup
+    bucket = func.date_bin(
+        literal_column(f"INTERVAL '{int(step.total_seconds())} seconds'"),
+        source.timestamp,
+        literal_column(f"TIMESTAMP '{BUCKET_ORIGIN.isoformat(sep=' ')}'")
+    )
+    columns = ["resolution", "bucket_start", "samples"]
+    selected = [literal(resolution), bucket, func.count(source.id)]
+    for name in spec.stat_fields:
+        column = getattr(source, name)
+        columns += [f"{name}_count", f"{name}_sum", f"{name}_min", f"{name}_max"]
+        selected += [func.count(column), func.coalesce(func.sum(column), 0), func.min(column), func.max(column)]
+
+    query = select(*selected).where(source.timestamp.isnot(None)).group_by(bucket)
+    # Live buckets are written in the same transaction as their raw rows, so only
+    # history older than the first stored bucket can be missing.
+    first_bucket = db.query(func.min(rollup.bucket_start)).filter(rollup.resolution == resolution).scalar()
+    if first_bucket is not None:
+        query = query.where(source.timestamp < first_bucket)
+    stmt = pg_insert(rollup).from_select(columns, query).on_conflict_do_nothing(
+        index_elements=["resolution", "bucket_start"]
+    )
+    return db.execute(stmt).rowcount
+
+
+def rollup_columns(spec: RollupSpec) -> List[str]:
+    columns = ["timestamp", "samples"]
+    for name in spec.stat_fields:
+        columns += [name, f"{name}_min", f"{name}_max"]
+    return columns
+
+
+def rollup_values(spec: RollupSpec, row) -> tuple:
+    values = [row.bucket_start, row.samples]
+    for name in spec.stat_fields:
+        count = getattr(row, f"{name}_count")
+        values += [
+            getattr(row, f"{name}_sum") / count if count else None,
+            getattr(row, f"{name}_min"),
+            getattr(row, f"{name}_max"),
+        ]
+    return tuple(values)
+
+
+def read_rollup(db, spec: RollupSpec, resolution: str, since: datetime) -> Table:
+    rollup = spec.rollup
+    rows = db.query(rollup).filter(
+        rollup.resolution == resolution,
+        rollup.bucket_start >= bucket_floor(since, RESOLUTIONS[resolution])
+    ).order_by(rollup.bucket_start).all()
+    return Table(rollup_columns(spec), [rollup_values(spec, row) for row in rows])
+
+
+def read_device_rollup(db, resolution: str, since: datetime) -> Table:
+    """Device tiers come straight from the transition intervals instead of a rollup table."""
+    step = RESOLUTIONS[resolution]
+    start = bucket_floor(since, step)
+    now = datetime.utcnow()
+    columns = ["timestamp"]
+    for name in DEVICE_NAMES:
+        columns += [name, f"{name}_uptime_pct"]
+    rows = []
+    for bucket_start, durations in bucket_durations(load_intervals(db, start, now), start, now, step, now):
+        if not durations or not any(known for _, known in durations.values()):
+            continue
+        values = [bucket_start]
+        for name in DEVICE_NAMES:
+            on, known = durations.get(name, (0.0, 0.0))
+            values += [on * 2 >= known if known else None, duty_cycle(on, known)]
+        rows.append(tuple(values))
+    return Table(columns, rows)
+
+
+class RollupPyramid:
+    def __init__(self, specs: List[RollupSpec] = PYRAMIDS, session_factory=SessionLocal):
+        self.specs = specs
+        self.session_factory = session_factory
+
+    def on_flush(self, db, batch: Dict[type, List[dict]]):
+        for spec in self.specs:
+            # Buckets summarise what was collected, so compressed-away readings
+            # still count and late-archived ones are not counted twice.
+            values = observed_rows(batch.get(spec.source, []))
+            if not values:
+                continue
+            for resolution, step in RESOLUTIONS.items():
+                buckets: Dict[datetime, BucketAccumulator] = {}
+                for row in values:
+                    start = bucket_floor(row["timestamp"], step)
+                    acc = buckets.get(start)
+                    if acc is None:
+                        acc = buckets[start] = BucketAccumulator(bucket_start=start)
+                    acc.add(spec, row)
+                upsert_rollup_deltas(db, spec, [acc.to_row(spec, resolution) for _, acc in sorted(buckets.items())])
+
+    def backfill(self) -> int:
+        """Build missing buckets from stored rows; run before live writes start."""
+        filled = 0
+        db = self.session_factory()
+        try:
+            for spec in self.specs:
+                for resolution in RESOLUTIONS:
+                    filled += backfill_rollup(db, spec, resolution) or 0
+            db.commit()
+        finally:
+            db.close()
+        if filled:
+            print(f"[{datetime.now()}] Backfilled {filled} rollup buckets")
+        return filled
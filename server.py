@@ -1,7 +1,26 @@
 #!/usr/bin/env python3
 """FastAPI server for Sol Dashboard with data collection and analytics."""
 
+import os
+
 import uvicorn
 
+from api import app, broadcaster
+
+# Requests still running this long after a shutdown signal are cancelled, so
+# lifespan shutdown (and the write-buffer flush) always gets to run.
+SHUTDOWN_TIMEOUT_SECONDS = int(os.environ.get("SHUTDOWN_TIMEOUT_SECONDS", "10"))
+
+
+class Server(uvicorn.Server):
+    def handle_exit(self, sig, frame):
+        # Event streams never finish on their own; end them so the server is
+        # not left waiting for every open tab to disconnect.
+        broadcaster.close_threadsafe()
+        super().handle_exit(sig, frame)
+
+
 if __name__ == "__main__":
-    uvicorn.run("api:app", host="0.0.0.0", port=5000, reload=False)
+    config = uvicorn.Config(app, host="0.0.0.0", port=5000, reload=False,
+                            timeout_graceful_shutdown=SHUTDOWN_TIMEOUT_SECONDS)
+    Server(config).run()
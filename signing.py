@@ -0,0 +1,111 @@
+"""Cached, concurrent signed-URL generation through the object storage sidecar."""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Optional, Tuple
+
+import httpx
+
+import object_storage
+from object_storage import SIGNED_URL_ENDPOINT, signed_url_request
+
+SIGNED_URL_CONCURRENCY = int(os.environ.get("SIGNED_URL_CONCURRENCY", "64"))
+SIGNED_URL_CACHE_SIZE = int(os.environ.get("SIGNED_URL_CACHE_SIZE", "20000"))
+SIGNED_URL_TIMEOUT = float(os.environ.get("SIGNED_URL_TIMEOUT", "15"))
+# Expiry times are rounded up to windows of ttl / SIGNED_URL_WINDOWS, so every
+# request in the same window gets the same URL (and browsers can cache the
+# image) while the remaining lifetime never drops below the requested ttl.
+SIGNED_URL_WINDOWS = int(os.environ.get("SIGNED_URL_WINDOWS", "4"))
+
+CacheKey = Tuple[str, int, int]
+
+
+class UrlSigner:
+    def __init__(self, concurrency: int = SIGNED_URL_CONCURRENCY, cache_size: int = SIGNED_URL_CACHE_SIZE):
+        self.concurrency = concurrency
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[CacheKey, str]" = OrderedDict()
+        self._inflight: Dict[CacheKey, asyncio.Future] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _window(self, ttl_sec: int) -> Tuple[int, int]:
+        step = max(ttl_sec // SIGNED_URL_WINDOWS, 1)
+        window = int(time.time()) // step
+        return window, (window + 1) * step + ttl_sec
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                timeout=SIGNED_URL_TIMEOUT,
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._client
+
+    async def _request(self, path: str, expires_at: int) -> str:
+        if not object_storage.get_backend().signs_urls:
+            return object_storage.get_public_url(path)
+        client = self._get_client()
+        body = signed_url_request(path, datetime.fromtimestamp(expires_at, timezone.utc).replace(tzinfo=None))
+        async with self._semaphore:
+            response = await client.post(SIGNED_URL_ENDPOINT, json=body)
+        if not response.is_success:
+            raise Exception(f"Failed to sign URL: {response.status_code}")
+        return response.json().get("signed_url")
+
+    def _store(self, key: CacheKey, url: str):
+        self._cache[key] = url
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def sign(self, path: str, ttl_sec: int = 3600) -> str:
+        window, expires_at = self._window(ttl_sec)
+        key = (path, ttl_sec, window)
+        url = self._cache.get(key)
+        if url is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return url
+        # Single flight: concurrent requests for the same path wait on the
+        # first caller's sidecar round-trip instead of issuing their own.
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            url = await self._request(path, expires_at)
+            self._store(key, url)
+            future.set_result(url)
+            return url
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise it; mark it retrieved so a failure nobody else
+            # was waiting on isn't logged as unobserved.
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def sign_many(self, paths: Iterable[str], ttl_sec: int = 3600) -> Dict[str, Optional[str]]:
+        """Sign every path concurrently; paths that fail to sign map to None."""
+        paths = list(dict.fromkeys(paths))
+        results = await asyncio.gather(*[self.sign(path, ttl_sec) for path in paths], return_exceptions=True)
+        return {path: None if isinstance(url, BaseException) else url for path, url in zip(paths, results)}
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
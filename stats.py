@@ -0,0 +1,155 @@
+"""Maintained per-table row counts and time bounds for /api/stats."""
+
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from database import SessionLocal
+from models import SensorReading, DeviceState, DeviceTransition, AIOutput, CoinMetric, TableStat
+from write_buffer import stored_rows
+
+STATS_MODELS = [SensorReading, DeviceState, DeviceTransition, CoinMetric, AIOutput]
+STATS_RECONCILE_MODE = os.environ.get("STATS_RECONCILE_MODE", "exact")
+
+
+def record_rows(db, table_name: str, count: int, oldest: Optional[datetime], newest: Optional[datetime]):
+    stmt = pg_insert(TableStat).values(
+        table_name=table_name, row_count=count, oldest=oldest, newest=newest, updated_at=datetime.utcnow()
+    )
+    # least/greatest ignore NULLs, so a zero-row call leaves the bounds alone.
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[TableStat.table_name],
+        set_={
+            "row_count": TableStat.row_count + count,
+            "oldest": func.least(TableStat.oldest, stmt.excluded.oldest),
+            "newest": func.greatest(TableStat.newest, stmt.excluded.newest),
+            "updated_at": stmt.excluded.updated_at
+        }
+    ))
+
+
+def batch_bounds(rows: List[dict]):
+    timestamps = [row["timestamp"] for row in rows if row.get("timestamp") is not None]
+    if not timestamps:
+        return None, None
+    return min(timestamps), max(timestamps)
+
+
+class TableStats:
+    def __init__(self, session_factory=SessionLocal, models=STATS_MODELS):
+        self.session_factory = session_factory
+        self.models = {model: model.__tablename__ for model in models}
+        self.tables: Dict[str, dict] = {}
+        self.loaded = False
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def on_flush(self, db, batch: Dict[type, List[dict]]):
+        # Runs inside the flush transaction, so counts move with the rows.
+        for model, rows in batch.items():
+            rows = stored_rows(rows)
+            if model in self.models and rows:
+                record_rows(db, self.models[model], len(rows), *batch_bounds(rows))
+
+    def after_flush(self, batch: Dict[type, List[dict]]):
+        with self._lock:
+            for model, rows in batch.items():
+                rows = stored_rows(rows)
+                if model not in self.models or not rows:
+                    continue
+                oldest, newest = batch_bounds(rows)
+                entry = self.tables.setdefault(self.models[model], {"row_count": 0, "oldest": None, "newest": None})
+                entry["row_count"] += len(rows)
+                if oldest is not None and (entry["oldest"] is None or oldest < entry["oldest"]):
+                    entry["oldest"] = oldest
+                if newest is not None and (entry["newest"] is None or newest > entry["newest"]):
+                    entry["newest"] = newest
+
+    def load(self):
+        db = self.session_factory()
+        try:
+            stored = {row.table_name: row for row in db.query(TableStat).all()}
+            tables = {}
+            for model, name in self.models.items():
+                row = stored.get(name)
+                if row is None:
+                    tables[name] = self._reconcile_table(db, model, "exact")
+                else:
+                    tables[name] = {"row_count": row.row_count, "oldest": row.oldest, "newest": row.newest}
+        finally:
+            db.close()
+        with self._lock:
+            self.tables = tables
+            self.loaded = True
+
+    def ensure_loaded(self):
+        # A first load may count whole tables; concurrent callers share it.
+        if not self.loaded:
+            with self._load_lock:
+                if not self.loaded:
+                    self.load()
+
+    def _reconcile_table(self, db, model, mode: str) -> dict:
+        name = self.models[model]
+        # Take the stats row lock first: flushes committed before us are in the
+        # count, flushes still in flight add their increment after we commit.
+        record_rows(db, name, 0, None, None)
+        count = None
+        if mode == "estimate":
+            estimate = db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"), {"name": name}
+            ).scalar()
+            # reltuples is -1 (or 0 on older servers) until the table is analyzed.
+            if estimate is not None and estimate > 0:
+                count = estimate
+        if count is None:
+            count = db.query(func.count(model.id)).scalar()
+        oldest, newest = db.query(func.min(model.timestamp), func.max(model.timestamp)).one()
+        now = datetime.utcnow()
+        row = db.get(TableStat, name, populate_existing=True)
+        row.row_count = count
+        row.oldest = oldest
+        row.newest = newest
+        row.reconciled_at = now
+        row.updated_at = now
+        db.commit()
+        return {"row_count": count, "oldest": oldest, "newest": newest}
+
+    def reconcile(self, mode: str = STATS_RECONCILE_MODE):
+        """Reset every table's count (exact or planner estimate) and time bounds."""
+        db = self.session_factory()
+        try:
+            tables = {}
+            for model, name in self.models.items():
+                tables[name] = self._reconcile_table(db, model, mode)
+        finally:
+            db.close()
+        with self._lock:
+            for name, entry in tables.items():
+                previous = self.tables.get(name, {}).get("row_count")
+                if previous is not None and previous != entry["row_count"]:
+                    print(f"[{datetime.now()}] Reconciled {name} count {previous} -> {entry['row_count']}")
+            self.tables = tables
+            self.loaded = True
+
+    def get(self, table_name: str) -> dict:
+        self.ensure_loaded()
+        with self._lock:
+            return dict(self.tables.get(table_name) or {"row_count": 0, "oldest": None, "newest": None})
+
+    def snapshot(self) -> dict:
+        sensors = self.get(SensorReading.__tablename__)
+        return {
+            "total_records": {
+                name: self.get(name)["row_count"]
+                for name in ("sensor_readings", "device_states", "device_transitions", "coin_metrics", "ai_outputs")
+            },
+            "data_range": {
+                "oldest": sensors["oldest"].isoformat() if sensors["oldest"] else None,
+                "newest": sensors["newest"].isoformat() if sensors["newest"] else None
+            }
+        }
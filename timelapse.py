@@ -0,0 +1,165 @@
+"""Per-day MJPEG timelapses of the webcam, appended to as frames are stored, with a byte-offset index."""
+
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+import object_storage
+from database import SessionLocal
+from images import jpeg_rendition
+from models import TimelapseFrame, WebcamFrame
+from webcam import frame_variant_path
+
+TIMELAPSE_PREFIX = "timelapse/"
+# Concatenated JPEGs; the index gives each frame's byte range.
+TIMELAPSE_CONTENT_TYPE = "video/x-motion-jpeg"
+OVERVIEW = "overview"
+TIMELAPSE_BATCH_SIZE = int(os.environ.get("TIMELAPSE_BATCH_SIZE", "200"))
+# The overview keeps one frame per interval across the whole grow.
+TIMELAPSE_OVERVIEW_SECONDS = float(os.environ.get("TIMELAPSE_OVERVIEW_SECONDS", "3600"))
+SOL_PLANTED_DATE = date.fromisoformat(os.environ.get("SOL_PLANTED_DATE", "2025-11-24"))
+
+
+def day_key(day: date) -> str:
+    return f"day/{day.isoformat()}"
+
+
+def sol_number(day: date) -> int:
+    # Day 1 is the planting day, as in the uploader's sol_day.
+    return (day - SOL_PLANTED_DATE).days + 1
+
+
+def sol_date(sol: int) -> date:
+    return SOL_PLANTED_DATE + timedelta(days=sol - 1)
+
+
+def timelapse_object_path(key: str) -> str:
+    return f"{TIMELAPSE_PREFIX}{key}.mjpeg"
+
+
+def describe(key: str) -> dict:
+    if not key.startswith("day/"):
+        return {"timelapse": key}
+    day = date.fromisoformat(key[len("day/"):])
+    return {"timelapse": key, "date": day.isoformat(), "sol": sol_number(day)}
+
+
+class TimelapseBuilder:
+    """Appends stored frames to their day's timelapse and the overview, in capture order."""
+
+    def __init__(self, session_factory=SessionLocal, batch_size: int = TIMELAPSE_BATCH_SIZE,
+                 overview_seconds: float = TIMELAPSE_OVERVIEW_SECONDS):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.overview_every = timedelta(seconds=overview_seconds)
+        self.appended = 0
+
+    def _frame_image(self, frame: WebcamFrame) -> Optional[bytes]:
+        """The frame's thumbnail, or None for a frame Pillow cannot decode."""
+        path = frame_variant_path(frame, "thumb")
+        content = object_storage.read_file(path)
+        if path == frame.path:
+            # Frames from before renditions existed are shrunk here instead;
+            # undecodable frames are stored as fetched and end up here too.
+            try:
+                content = jpeg_rendition(content, "thumb") or content
+            except OSError as e:
+                print(f"Webcam frame cannot be decoded, left out of the timelapse: {frame.path} ({e})")
+                return None
+        return content
+
+    def _append(self, db, key: str, pieces: List[Tuple[datetime, bytes]]):
+        data = b"".join(content for _, content in pieces)
+        _, size = object_storage.append_file(data, timelapse_object_path(key), TIMELAPSE_CONTENT_TYPE)
+        # Offsets come from the object's real size, so bytes left by an append
+        # whose index rows never committed do not shift later frames.
+        offset = size - len(data)
+        rows = []
+        for timestamp, content in pieces:
+            rows.append({"timelapse": key, "timestamp": timestamp, "offset": offset, "length": len(content)})
+            offset += len(content)
+        db.execute(pg_insert(TimelapseFrame).values(rows).on_conflict_do_nothing(
+            index_elements=[TimelapseFrame.timelapse, TimelapseFrame.timestamp]
+        ))
+
+    def catch_up(self) -> int:
+        """Append every frame stored since the last run; returns how many were appended."""
+        db = self.session_factory()
+        try:
+            after = db.query(func.max(TimelapseFrame.timestamp)).filter(TimelapseFrame.timelapse != OVERVIEW).scalar()
+            overview_last = db.query(func.max(TimelapseFrame.timestamp)).filter(TimelapseFrame.timelapse == OVERVIEW).scalar()
+            appended = 0
+            while True:
+                query = db.query(WebcamFrame)
+                if after is not None:
+                    query = query.filter(WebcamFrame.timestamp > after)
+                frames = query.order_by(WebcamFrame.timestamp).limit(self.batch_size).all()
+                if not frames:
+                    break
+                days: Dict[date, List[Tuple[datetime, bytes]]] = {}
+                overview = []
+                for frame in frames:
+                    try:
+                        content = self._frame_image(frame)
+                    except FileNotFoundError:
+                        print(f"Webcam frame missing from storage, left out of the timelapse: {frame.path}")
+                        continue
+                    if content is None:
+                        continue
+                    days.setdefault(frame.timestamp.date(), []).append((frame.timestamp, content))
+                    if overview_last is None or frame.timestamp - overview_last >= self.overview_every:
+                        overview.append((frame.timestamp, content))
+                        overview_last = frame.timestamp
+                # One append per timelapse per batch keeps GCS compose calls (and components) down.
+                for day, pieces in days.items():
+                    self._append(db, day_key(day), pieces)
+                if overview:
+                    self._append(db, OVERVIEW, overview)
+                db.commit()
+                appended += sum(len(pieces) for pieces in days.values())
+                after = frames[-1].timestamp
+            if appended:
+                self.appended += appended
+                print(f"[{datetime.now()}] Appended {appended} webcam frames to timelapses")
+            return appended
+        finally:
+            db.close()
+
+
+def timelapse_index(db, key: str) -> Optional[dict]:
+    """Where the artifact lives and the byte range of every frame in it, oldest first."""
+    rows = db.query(TimelapseFrame.timestamp, TimelapseFrame.offset, TimelapseFrame.length).filter(
+        TimelapseFrame.timelapse == key
+    ).order_by(TimelapseFrame.timestamp).all()
+    if not rows:
+        return None
+    index = describe(key)
+    index.update({
+        "path": object_storage.full_object_path(timelapse_object_path(key)),
+        "content_type": TIMELAPSE_CONTENT_TYPE,
+        "count": len(rows),
+        "bytes": max(offset + length for _, offset, length in rows),
+        "start": rows[0][0].isoformat(),
+        "end": rows[-1][0].isoformat(),
+        "frames": [[timestamp.isoformat(), offset, length] for timestamp, offset, length in rows]
+    })
+    return index
+
+
+def list_timelapses(db) -> List[dict]:
+    rows = db.query(
+        TimelapseFrame.timelapse,
+        func.count(TimelapseFrame.id),
+        func.min(TimelapseFrame.timestamp),
+        func.max(TimelapseFrame.timestamp),
+        func.max(TimelapseFrame.offset + TimelapseFrame.length)
+    ).group_by(TimelapseFrame.timelapse).order_by(TimelapseFrame.timelapse).all()
+    result = []
+    for key, count, start, end, size in rows:
+        entry = describe(key)
+        entry.update({"count": count, "bytes": size, "start": start.isoformat(), "end": end.isoformat()})
+        result.append(entry)
+    return result
@@ -0,0 +1,185 @@
+"""Index of stored webcam frames, so endpoints never have to list the bucket."""
+
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import desc, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+import object_storage
+from database import SessionLocal
+from images import hash_distance, perceptual_hash, renditions
+from ingest import content_hash
+from likes import increment_counter
+from models import Counter, WebcamFrame
+from pagination import decode_cursor, encode_cursor
+
+WEBCAM_PREFIX = "webcam/"
+FRAME_FILENAME_FORMAT = "frame_%Y-%m-%d_%H-%M-%S.jpg"
+WEBCAM_IMPORT_MARKER = "webcam_bucket_import"
+WEBCAM_IMPORT_BATCH_SIZE = int(os.environ.get("WEBCAM_IMPORT_BATCH_SIZE", "1000"))
+# Renditions live outside WEBCAM_PREFIX so the bucket import never mistakes them for frames.
+WEBCAM_RENDITION_PREFIX = "webcam-renditions/"
+FRAME_SIZES = ["original", "medium", "thumb"]
+FRAME_SIZE_PATTERN = f"^({'|'.join(FRAME_SIZES)})$"
+# Frames whose perceptual hash is within this many bits of the last stored
+# frame are dropped as near-duplicates; 0 keeps everything that differs at all.
+WEBCAM_DEDUP_DISTANCE = int(os.environ.get("WEBCAM_DEDUP_DISTANCE", "3"))
+# Even an unchanging scene gets a stored frame this often.
+WEBCAM_KEEP_SECONDS = float(os.environ.get("WEBCAM_KEEP_SECONDS", "3600"))
+
+
+def frame_object_path(captured_at: datetime) -> str:
+    return f"{WEBCAM_PREFIX}{captured_at.strftime(FRAME_FILENAME_FORMAT)}"
+
+
+def frame_time(name: str, updated: Optional[str]) -> Optional[datetime]:
+    """Capture time from the object name, falling back to the blob's update time."""
+    try:
+        return datetime.strptime(name.rsplit("/", 1)[-1], FRAME_FILENAME_FORMAT)
+    except ValueError:
+        pass
+    if updated:
+        parsed = datetime.fromisoformat(updated)
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+    return None
+
+
+def rendition_object_path(frame_hash: str, name: str) -> str:
+    """Content-addressed: the same frame always maps to the same objects, so re-uploads are harmless."""
+    return f"{WEBCAM_RENDITION_PREFIX}{frame_hash}/{name}"
+
+
+def frame_variant_path(frame, size: str = "original", webp: bool = False) -> str:
+    """Storage path of the closest available rendition, falling back to the original frame."""
+    if size == "original" or not frame.content_hash or not frame.renditions:
+        return frame.path
+    available = frame.renditions.split(",")
+    for name in ([f"{size}.webp"] if webp else []) + [f"{size}.jpg"]:
+        if name in available:
+            return object_storage.full_object_path(rendition_object_path(frame.content_hash, name))
+    return frame.path
+
+
+class FrameProcessor:
+    """Drops near-duplicate frames and stores each kept one together with its smaller renditions."""
+
+    def __init__(self, distance: int = WEBCAM_DEDUP_DISTANCE, keep_seconds: float = WEBCAM_KEEP_SECONDS):
+        self.distance = distance
+        self.keep_every = timedelta(seconds=keep_seconds)
+        self.processed = 0
+        self.dropped = 0
+        self._last: Optional[Tuple[Optional[str], datetime]] = None
+        self._lock = threading.Lock()
+
+    def seed(self, phash: Optional[str], timestamp: datetime):
+        with self._lock:
+            self._last = (phash, timestamp)
+
+    def reset(self):
+        with self._lock:
+            self._last = None
+
+    def _is_near_duplicate(self, phash: Optional[str], captured_at: datetime) -> bool:
+        if phash is None or self._last is None or self._last[0] is None:
+            return False
+        last_hash, last_time = self._last
+        # Compared with the last stored frame rather than the last fetched one,
+        # so a slow drift still gets stored once it adds up.
+        return captured_at - last_time < self.keep_every and hash_distance(phash, last_hash) <= self.distance
+
+    def process(self, content: bytes, captured_at: datetime, frame_hash: Optional[str] = None) -> Optional[dict]:
+        """Store a fetched frame; returns its webcam_frames row, or None when it was a near-duplicate.
+
+        Blocking (decoding and uploads), so call it from a worker thread.
+        """
+        frame_hash = frame_hash or content_hash(content)
+        try:
+            phash = perceptual_hash(content)
+        except Exception as e:
+            print(f"Cannot decode webcam frame, storing it as is: {e}")
+            phash = None
+        with self._lock:
+            self.processed += 1
+            if self._is_near_duplicate(phash, captured_at):
+                self.dropped += 1
+                return None
+        path = object_storage.save_file(content, frame_object_path(captured_at), "image/jpeg")
+        stored = []
+        try:
+            for name, content_type, data in renditions(content):
+                object_storage.save_file(data, rendition_object_path(frame_hash, name), content_type)
+                stored.append(name)
+        except Exception as e:
+            # The original is safe; clients just get it instead of a rendition.
+            print(f"Error storing webcam renditions: {e}")
+        with self._lock:
+            self._last = (phash, captured_at)
+        return {
+            "timestamp": captured_at,
+            "path": path,
+            "size": len(content),
+            "content_type": "image/jpeg",
+            "content_hash": frame_hash,
+            "perceptual_hash": phash,
+            "renditions": ",".join(stored) or None
+        }
+
+
+def _insert_frames(db, rows: List[dict]):
+    db.execute(pg_insert(WebcamFrame).values(rows).on_conflict_do_nothing(index_elements=[WebcamFrame.path]))
+
+
+def import_bucket_frames(session_factory=SessionLocal, force: bool = False) -> int:
+    """One-time backfill of the frame index from the bucket listing; later runs are no-ops."""
+    db = session_factory()
+    try:
+        if not force and db.get(Counter, WEBCAM_IMPORT_MARKER) is not None:
+            return 0
+        imported = 0
+        batch = []
+        for file in object_storage.iter_files(WEBCAM_PREFIX):
+            timestamp = frame_time(file["name"], file.get("updated"))
+            if timestamp is None:
+                continue
+            batch.append({
+                "timestamp": timestamp,
+                "path": file["path"],
+                "size": file.get("size"),
+                "content_type": file.get("content_type")
+            })
+            if len(batch) >= WEBCAM_IMPORT_BATCH_SIZE:
+                _insert_frames(db, batch)
+                imported += len(batch)
+                batch = []
+        if batch:
+            _insert_frames(db, batch)
+            imported += len(batch)
+        increment_counter(db, WEBCAM_IMPORT_MARKER, imported)
+        db.commit()
+        print(f"[{datetime.now()}] Indexed {imported} webcam frames from the bucket")
+        return imported
+    finally:
+        db.close()
+
+
+def frame_page(db, limit: int, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               before: Optional[str] = None) -> Tuple[List[WebcamFrame], Optional[str]]:
+    """Newest frames first; returns the frames and a cursor for the next (older) page."""
+    query = db.query(WebcamFrame)
+    if start is not None:
+        query = query.filter(WebcamFrame.timestamp >= start)
+    if end is not None:
+        query = query.filter(WebcamFrame.timestamp < end)
+    if before:
+        query = query.filter(tuple_(WebcamFrame.timestamp, WebcamFrame.id) < tuple_(*decode_cursor(before)))
+    frames = query.order_by(desc(WebcamFrame.timestamp), desc(WebcamFrame.id)).limit(limit + 1).all()
+    next_cursor = None
+    if len(frames) > limit:
+        frames = frames[:limit]
+        next_cursor = encode_cursor(frames[-1].timestamp, frames[-1].id)
+    return frames, next_cursor
@@ -0,0 +1,265 @@
+"""Write-behind buffer that group-commits rows from every collector."""
+
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import UniqueConstraint
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import OperationalError, StatementError
+
+from database import SessionLocal
+
+WRITE_BUFFER_MAX_ROWS = int(os.environ.get("WRITE_BUFFER_MAX_ROWS", "500"))
+WRITE_BUFFER_MAX_DELAY = float(os.environ.get("WRITE_BUFFER_MAX_DELAY", "5"))
+WRITE_BUFFER_MAX_PENDING = int(os.environ.get("WRITE_BUFFER_MAX_PENDING", "50000"))
+
+# Rows may carry a ROW_ROLE. OBSERVED rows (a reading compression chose not to
+# store) reach hooks and listeners but are not inserted. ARCHIVED rows (a reading
+# stored after the fact) are inserted but were already observed when collected.
+ROW_ROLE = "_role"
+OBSERVED = "observed"
+ARCHIVED = "archived"
+
+FlushListener = Callable[[Dict[type, List[dict]]], None]
+FlushHook = Callable[[object, Dict[type, List[dict]]], None]
+
+
+def unique_key(model: type) -> Optional[List[str]]:
+    """Columns of the model's first unique key besides the primary key, or None."""
+    table = model.__table__
+    for column in table.columns:
+        if column.unique and not column.primary_key:
+            return [column.name]
+    for index in table.indexes:
+        if index.unique:
+            return [column.name for column in index.columns]
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            return [column.name for column in constraint.columns]
+    return None
+
+
+def stored_rows(rows: List[dict]) -> List[dict]:
+    """Rows that are written to their table."""
+    return [row for row in rows if row.get(ROW_ROLE) != OBSERVED]
+
+
+def observed_rows(rows: List[dict]) -> List[dict]:
+    """Rows that are new to in-memory state: everything collected, minus late archives."""
+    return [row for row in rows if row.get(ROW_ROLE) != ARCHIVED]
+
+
+def strip_role(row: dict) -> dict:
+    if ROW_ROLE not in row:
+        return row
+    return {name: value for name, value in row.items() if name != ROW_ROLE}
+
+
+class WriteBuffer:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        max_rows: int = WRITE_BUFFER_MAX_ROWS,
+        max_delay: float = WRITE_BUFFER_MAX_DELAY,
+        max_pending: int = WRITE_BUFFER_MAX_PENDING,
+    ):
+        self.session_factory = session_factory
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self._pending: Dict[type, List[dict]] = {}
+        self._size = 0
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._listeners: List[FlushListener] = []
+        self._hooks: List[FlushHook] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add_listener(self, listener: FlushListener):
+        self._listeners.append(listener)
+
+    def add_hook(self, hook: FlushHook):
+        # Hooks run inside the flush transaction, so derived rows commit or roll
+        # back together with the raw rows they were computed from.
+        self._hooks.append(hook)
+
+    def add(self, model: type, values: dict, role: Optional[str] = None):
+        if role is not None:
+            values = {**values, ROW_ROLE: role}
+        with self._lock:
+            self._pending.setdefault(model, []).append(values)
+            self._size += 1
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            full = self._size >= self.max_rows
+        if full:
+            self._wake()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _wake(self):
+        if self._loop is None or self._wakeup is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        except RuntimeError:
+            pass
+
+    def _take(self) -> Dict[type, List[dict]]:
+        with self._lock:
+            batch = self._pending
+            self._pending = {}
+            self._size = 0
+            self._oldest = None
+        return batch
+
+    def _requeue(self, batch: Dict[type, List[dict]]):
+        with self._lock:
+            for model, rows in batch.items():
+                self._pending[model] = rows + self._pending.get(model, [])
+                self._size += len(rows)
+            dropped = 0
+            while self._size > self.max_pending and self._pending:
+                model = next(iter(self._pending))
+                rows = self._pending[model]
+                overflow = min(self._size - self.max_pending, len(rows))
+                del rows[:overflow]
+                self._size -= overflow
+                dropped += overflow
+                if not rows:
+                    del self._pending[model]
+            if self._oldest is None and self._size:
+                self._oldest = time.monotonic()
+        if dropped:
+            print(f"Write buffer over capacity, dropped {dropped} oldest rows")
+
+    def _insert(self, db, batch: Dict[type, List[dict]]) -> Dict[type, List[dict]]:
+        """Insert the batch; returns it without the rows a unique key skipped."""
+        inserted: Dict[type, List[dict]] = {}
+        for model, rows in batch.items():
+            # executemany through insert() lets SQLAlchemy batch the rows into
+            # multi-VALUES statements instead of one INSERT per ORM object.
+            values = [strip_role(row) for row in stored_rows(rows)]
+            key = unique_key(model)
+            if values and key is None:
+                db.execute(pg_insert(model), values)
+            elif values:
+                # Rows that hit a unique key (a frame path) are already stored:
+                # skip them rather than fail the batch, and keep them from
+                # hooks and listeners, which only hear about new rows.
+                columns = [model.__table__.c[name] for name in key]
+                result = db.execute(pg_insert(model).on_conflict_do_nothing().returning(*columns), values)
+                new = {tuple(row) for row in result}
+                rows = [row for row in rows if row.get(ROW_ROLE) == OBSERVED or tuple(row.get(name) for name in key) in new]
+            if rows:
+                inserted[model] = rows
+        return inserted
+
+    def _insert_isolated(self, db, batch: Dict[type, List[dict]]) -> Dict[type, List[dict]]:
+        """Insert row by row, each in a savepoint, dropping the rows the database rejects on their own."""
+        kept: Dict[type, List[dict]] = {}
+        for model, rows in batch.items():
+            for row in rows:
+                try:
+                    with db.begin_nested():
+                        inserted = self._insert(db, {model: [row]})
+                except StatementError as e:
+                    # A lost connection fails every row alike; let the caller requeue.
+                    if isinstance(e, OperationalError) or getattr(e, "connection_invalidated", False):
+                        raise
+                    reason = getattr(e, "orig", None) or e
+                    print(f"Dropping {model.__tablename__} row rejected by the database: {row} ({reason})")
+                    continue
+                if inserted:
+                    kept.setdefault(model, []).append(row)
+        return kept
+
+    def _commit(self, batch: Dict[type, List[dict]], insert) -> Dict[type, List[dict]]:
+        db = self.session_factory()
+        try:
+            batch = insert(db, batch)
+            for hook in self._hooks:
+                hook(db, batch)
+            db.commit()
+            return batch
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            batch = self._take()
+            if not batch:
+                return 0
+            try:
+                batch = self._commit(batch, self._insert)
+            except Exception as e:
+                print(f"Error flushing write buffer, retrying row by row: {e}")
+                # One bad row must not hold back every other collector's writes.
+                try:
+                    batch = self._commit(batch, self._insert_isolated)
+                except Exception as e:
+                    self._requeue(batch)
+                    print(f"Error flushing write buffer: {e}")
+                    return 0
+
+            count = sum(len(rows) for rows in batch.values())
+            for listener in self._listeners:
+                try:
+                    listener(batch)
+                except Exception as e:
+                    print(f"Error in write buffer listener: {e}")
+            print(f"[{datetime.now()}] Flushed {count} buffered rows")
+            return count
+
+    def _time_to_deadline(self) -> float:
+        with self._lock:
+            if not self._size:
+                return self.max_delay
+            if self._size >= self.max_rows:
+                return 0
+            return max(self._oldest + self.max_delay - time.monotonic(), 0)
+
+    def seconds_until_flush(self) -> Optional[float]:
+        """Seconds until the buffered rows are due to be written, or None when nothing is buffered."""
+        if not self._size:
+            return None
+        return self._time_to_deadline()
+
+    async def _run(self):
+        while True:
+            timeout = self._time_to_deadline()
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            if self._time_to_deadline() == 0:
+                await asyncio.to_thread(self.flush)
+
+    async def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="write_buffer")
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.to_thread(self.flush)
+        self._loop = None
+        self._wakeup = None